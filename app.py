@@ -3,7 +3,9 @@ Flask应用主入口文件
 """
 
 import os
+import time
 from flask import render_template, redirect
+from sqlalchemy import text
 from app import create_app
 from app.utils.logger import get_logger
 
@@ -16,13 +18,44 @@ app = create_app(env)
 # 获取日志记录器
 logger = get_logger('app')
 
+# ========== 静态响应缓存 ==========
+# 内容在进程生命周期内不变的响应，启动时生成一次，请求时只构造轻量的Response对象
+# 不直接复用同一个Response对象，因为after_request钩子会修改响应头
+
+API_INFO = {
+    'name': 'Prompt Manager API',
+    'version': '1.0.0',
+    'status': 'running',
+    'environment': env,
+    'endpoints': {
+        'auth': '/api/v1/auth',
+        'prompts': '/api/v1/prompts',
+        'tags': '/api/v1/tags',
+        'users': '/api/v1/users'
+    }
+}
+_API_INFO_BODY = app.json.dumps(API_INFO).encode('utf-8')
+
+_INDEX_REDIRECT = redirect('/login')
+_INDEX_REDIRECT_BODY = _INDEX_REDIRECT.get_data()
+_INDEX_REDIRECT_HEADERS = {'Location': _INDEX_REDIRECT.headers['Location']}
+
+# 数据库健康检查结果缓存，避免负载均衡的频繁探测每次都访问数据库
+HEALTH_CACHE_TTL = 5  # 秒
+_health_cache = {'ts': 0, 'value': 'unknown'}
+
 
 # ========== 页面路由 ==========
 
 @app.route('/')
 def index():
     """根路径 - 重定向到登录页"""
-    return redirect('/login')
+    return app.response_class(
+        _INDEX_REDIRECT_BODY,
+        status=302,
+        headers=_INDEX_REDIRECT_HEADERS,
+        mimetype='text/html'
+    )
 
 
 @app.route('/login')
@@ -60,18 +93,7 @@ def tags_page():
 @app.route('/api')
 def api_info():
     """API信息"""
-    return {
-        'name': 'Prompt Manager API',
-        'version': '1.0.0',
-        'status': 'running',
-        'environment': env,
-        'endpoints': {
-            'auth': '/api/v1/auth',
-            'prompts': '/api/v1/prompts',
-            'tags': '/api/v1/tags',
-            'users': '/api/v1/users'
-        }
-    }
+    return app.response_class(_API_INFO_BODY, mimetype='application/json')
 
 
 @app.route('/health')
@@ -79,28 +101,87 @@ def health():
     """健康检查接口"""
     return {
         'status': 'healthy',
-        'database': check_database_connection()
+        'database': check_database_connection(),
+        'pool': get_pool_status()
     }
 
 
+@app.route('/healthz')
+def healthz():
+    """
+    就绪探针
+    数据库不可用或连接池已耗尽时返回503，负载均衡据此摘除节点
+    """
+    if is_pool_exhausted() or check_database_connection() != 'connected':
+        return {'status': 'unavailable'}, 503
+    return {'status': 'ok'}
+
+
 def check_database_connection():
     """
     检查数据库连接状态
+    成功的检查结果会缓存 HEALTH_CACHE_TTL 秒，失败时下次请求会重新检查
     
     返回:
         str: 'connected' 或 'disconnected'
     """
+    now = time.monotonic()
+    if _health_cache['value'] == 'connected' and now - _health_cache['ts'] < HEALTH_CACHE_TTL:
+        return _health_cache['value']
+    
     try:
         from app.models.base import db
-        db.session.execute('SELECT 1')
-        return 'connected'
+        # 直接从连接池取连接执行，不经过session的事务管理
+        with db.engine.connect() as conn:
+            conn.scalar(text('SELECT 1'))
+        value = 'connected'
     except Exception as e:
         logger.error(f"数据库连接失败: {str(e)}")
-        return 'disconnected'
+        value = 'disconnected'
+    
+    _health_cache['ts'] = now
+    _health_cache['value'] = value
+    return value
+
+
+def is_pool_exhausted():
+    """
+    检查连接池是否已耗尽（已借出连接数达到 pool_size + max_overflow）
+    
+    返回:
+        bool: 是否已耗尽
+    """
+    try:
+        from app.models.base import db
+        limit = app.config['DB_POOL_SIZE'] + app.config['DB_MAX_OVERFLOW']
+        return db.engine.pool.checkedout() >= limit
+    except Exception as e:
+        logger.error(f"获取连接池状态失败: {str(e)}")
+        return False
+
+
+def get_pool_status():
+    """
+    获取数据库连接池状态，用于监控
+    
+    返回:
+        str: 连接池状态描述
+    """
+    try:
+        from app.models.base import db
+        return db.engine.pool.status()
+    except Exception as e:
+        logger.error(f"获取连接池状态失败: {str(e)}")
+        return 'unknown'
 
 
 if __name__ == '__main__':
-    """主程序入口"""
+    """主程序入口（仅用于开发环境）"""
+    
+    # 非开发环境使用gunicorn启动，避免Flask单线程开发服务器
+    if env != 'development':
+        logger.error("非开发环境请使用gunicorn启动: python -m gunicorn -c gunicorn.conf.py wsgi:app")
+        raise SystemExit(1)
     
     # 获取配置
     port = app.config.get('APP_PORT', 5002)
@@ -3,13 +3,19 @@ Flask应用初始化模块
 负责创建和配置Flask应用实例
 """
 
-from flask import Flask
-from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+import time
+
+from flask import Flask, request, g
+from werkzeug.exceptions import HTTPException
 
 from config.config import get_config
 from app.models.base import db
-from app.utils.logger import init_logger, get_logger
+from app.utils.auth import CachedJWTManager
+from app.utils.cache import init_cache, reset_cache
+from app.utils.json_provider import OrjsonProvider
+from app.utils.logger import init_logger, get_logger, restart_listeners
+from app.utils.security import init_password_pool, reset_password_pool
+from app.utils.tokens import init_token_encoders
 
 
 def create_app(env=None):
@@ -25,6 +31,9 @@ def create_app(env=None):
     # 创建Flask应用
     app = Flask(__name__)
     
+    # 使用orjson序列化JSON响应
+    app.json = OrjsonProvider(app)
+    
     # 加载配置
     config = get_config(env)
     app.config.from_object(config)
@@ -37,11 +46,20 @@ def create_app(env=None):
     # 初始化数据库
     db.init_app(app)
     
-    # 初始化JWT
-    jwt = JWTManager(app)
+    # 初始化JWT（带解码缓存）
+    jwt = CachedJWTManager(app)
+    
+    # 初始化密码哈希进程池
+    init_password_pool(app)
+    
+    # 初始化Redis缓存（可选）
+    init_cache(app)
+    
+    # 加载Token编码器（gunicorn预加载应用时只在master进程中加载一次）
+    init_token_encoders(app)
     
     # 配置CORS
-    CORS(app, origins=config.CORS_ORIGINS)
+    register_cors(app)
     
     # 注册蓝图
     register_blueprints(app)
@@ -52,8 +70,11 @@ def create_app(env=None):
     # 注册请求钩子
     register_request_hooks(app)
     
-    # 创建数据库表（开发环境）
-    if app.config['DEBUG']:
+    # 注册命令行命令
+    register_commands(app)
+    
+    # 创建数据库表（仅在显式开启FLASK_INIT_DB时，避免每个worker启动都执行DDL）
+    if app.config['INIT_DB']:
         with app.app_context():
             db.create_all()
             logger.info("数据库表创建完成")
@@ -61,6 +82,29 @@ def create_app(env=None):
     return app
 
 
+def reinit_after_fork(app):
+    """
+    在fork出的worker进程中重建进程级资源（gunicorn的post_fork钩子调用）
+    preload_app 时应用在master进程中创建，master已打开的数据库和Redis连接、
+    后台线程（写日志、合并计数）和密码哈希进程池都不能在子进程中继续使用
+    
+    参数:
+        app: Flask应用实例
+    """
+    # 继承的连接仍属于master，不关闭，只丢弃引用，子进程按需建立新连接
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    reset_cache()
+    
+    # 父进程的线程不会被fork复制，重新启动
+    restart_listeners()
+    reset_password_pool()
+    
+    from app.utils.counters import start_flusher
+    start_flusher(app)
+
+
 def register_blueprints(app):
     """
     注册所有蓝图
@@ -85,6 +129,69 @@ def register_blueprints(app):
     get_logger('app').info("蓝图注册完成")
 
 
+# CORS预检响应头，预检请求的响应内容对所有允许的来源都相同
+_CORS_PREFLIGHT_HEADERS = [
+    ('Access-Control-Allow-Methods', 'GET, HEAD, POST, OPTIONS, PUT, PATCH, DELETE'),
+    ('Access-Control-Allow-Headers', 'Authorization, Content-Type'),
+    ('Access-Control-Max-Age', '86400'),
+]
+
+
+def register_cors(app):
+    """
+    注册CORS处理
+    允许的来源在启动时构建为frozenset，预检请求直接返回204
+    
+    参数:
+        app: Flask应用实例
+    """
+    origins = frozenset(app.config.get('CORS_ORIGINS', ()))
+    allow_any = '*' in origins
+    
+    @app.before_request
+    def cors_preflight():
+        """预检请求直接返回，不进入视图函数"""
+        if request.method == 'OPTIONS' and 'Access-Control-Request-Method' in request.headers:
+            return app.response_class(status=204, headers=_CORS_PREFLIGHT_HEADERS)
+    
+    @app.after_request
+    def cors_headers(response):
+        """为允许的来源添加CORS响应头"""
+        origin = request.headers.get('Origin')
+        if origin is None:
+            return response
+        
+        if allow_any:
+            response.headers['Access-Control-Allow-Origin'] = '*'
+        elif origin in origins:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers.add('Vary', 'Origin')
+        return response
+
+
+def register_commands(app):
+    """
+    注册命令行命令
+    
+    参数:
+        app: Flask应用实例
+    """
+    @app.cli.command('init-db')
+    def init_db():
+        """创建数据库表"""
+        db.create_all()
+        get_logger('app').info("数据库表创建完成")
+        print("数据库表创建完成")
+    
+    @app.cli.command('flush-counters')
+    def flush_counters_command():
+        """将Redis中缓冲的查看次数写入数据库"""
+        from app.utils.counters import flush_counters
+        
+        flushed = flush_counters()
+        print(f"已写入 {flushed} 个Prompt的计数")
+
+
 def register_error_handlers(app):
     """
     注册全局错误处理器
@@ -92,18 +199,29 @@ def register_error_handlers(app):
     参数:
         app: Flask应用实例
     """
-    from flask import jsonify
-    from werkzeug.exceptions import HTTPException
+    def error_json(code, message, **extra):
+        """
+        构造错误响应
+        直接序列化为Response，省去jsonify的参数解析
+        
+        参数:
+            code: HTTP状态码
+            message: 错误消息
+            **extra: 附加字段
+        """
+        body = {'code': code, 'message': message, 'timestamp': int(time.time())}
+        if extra:
+            body.update(extra)
+        return app.response_class(
+            app.json.dumps(body),
+            status=code,
+            mimetype='application/json'
+        )
     
     @app.errorhandler(HTTPException)
     def handle_http_exception(e):
         """处理HTTP异常"""
-        response = {
-            'code': e.code,
-            'message': e.description,
-            'timestamp': int(datetime.now().timestamp())
-        }
-        return jsonify(response), e.code
+        return error_json(e.code, e.description)
     
     @app.errorhandler(Exception)
     def handle_exception(e):
@@ -111,37 +229,29 @@ def register_error_handlers(app):
         logger = get_logger('app')
         logger.error(f"未处理的异常: {str(e)}", exc_info=True)
         
-        response = {
-            'code': 500,
-            'message': '服务器内部错误',
-            'timestamp': int(datetime.now().timestamp())
-        }
-        
         # 开发环境显示详细错误
         if app.config['DEBUG']:
-            response['error'] = str(e)
+            return error_json(500, '服务器内部错误', error=str(e))
         
-        return jsonify(response), 500
+        return error_json(500, '服务器内部错误')
     
     @app.errorhandler(404)
     def handle_404(e):
         """处理404错误"""
-        response = {
-            'code': 404,
-            'message': '请求的资源不存在',
-            'timestamp': int(datetime.now().timestamp())
-        }
-        return jsonify(response), 404
+        return error_json(404, '请求的资源不存在')
     
     @app.errorhandler(401)
     def handle_401(e):
         """处理401未授权错误"""
-        response = {
-            'code': 401,
-            'message': '未授权访问',
-            'timestamp': int(datetime.now().timestamp())
-        }
-        return jsonify(response), 401
+        return error_json(401, '未授权访问')
+
+
+# 所有响应统一添加的安全头
+_SECURITY_HEADERS = [
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'DENY'),
+    ('X-XSS-Protection', '1; mode=block'),
+]
 
 
 def register_request_hooks(app):
@@ -151,36 +261,43 @@ def register_request_hooks(app):
     参数:
         app: Flask应用实例
     """
-    from flask import request, g
-    from datetime import datetime
-    import time
+    # 日志记录器只获取一次，钩子函数中直接复用
+    request_logger = get_logger('request')
+    app_logger = get_logger('app')
+    
+    # 探针等轻量接口，跳过计时和请求日志
+    fast_paths = frozenset(app.config.get('REQUEST_LOG_SKIP_PATHS', ()))
     
     @app.before_request
     def before_request():
         """请求前钩子"""
-        g.start_time = time.time()
+        if request.path in fast_paths:
+            return
+        
+        g.start_time = time.perf_counter_ns()
         
-        # 记录请求日志
-        logger = get_logger('request')
-        logger.info(f"{request.method} {request.path} - {request.remote_addr}")
+        # 记录请求日志（参数延迟到后台线程格式化）
+        request_logger.info("%s %s - %s", request.method, request.path, request.remote_addr)
     
     @app.after_request
     def after_request(response):
         """请求后钩子"""
-        if hasattr(g, 'start_time'):
-            elapsed = round(time.time() - g.start_time, 3)
+        if request.path in fast_paths:
+            # 轻量接口只添加安全头
+            response.headers.extend(_SECURITY_HEADERS)
+            return response
+        
+        if 'start_time' in g:
+            elapsed_us = (time.perf_counter_ns() - g.start_time) // 1000
             
-            # 添加响应时间头
-            response.headers['X-Response-Time'] = f"{elapsed}s"
+            # 添加响应时间头（微秒）
+            response.headers['X-Response-Time'] = f"{elapsed_us}us"
             
             # 记录响应日志
-            logger = get_logger('request')
-            logger.info(f"响应 {response.status_code} - 耗时 {elapsed}s")
+            request_logger.info("响应 %s - 耗时 %sus", response.status_code, elapsed_us)
         
         # 添加安全头
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        response.headers['X-Frame-Options'] = 'DENY'
-        response.headers['X-XSS-Protection'] = '1; mode=block'
+        response.headers.extend(_SECURITY_HEADERS)
         
         return response
     
@@ -189,9 +306,4 @@ def register_request_hooks(app):
         """清理数据库会话"""
         if exception:
             db.session.rollback()
-            logger = get_logger('app')
-            logger.error(f"请求异常，回滚数据库事务: {str(exception)}")
-
-
-# 导入必要的模块，避免循环导入
-from datetime import datetime
\ No newline at end of file
+            app_logger.error(f"请求异常，回滚数据库事务: {str(exception)}")
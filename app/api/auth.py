@@ -3,12 +3,14 @@
 处理用户注册、登录、登出等认证相关接口
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from werkzeug.exceptions import BadRequest, Unauthorized
 
 from app.models.user import User
 from app.models.base import db
+from app.api.schemas import RegisterRequest, LoginRequest, ChangePasswordRequest, decode_body
+from app.utils.auth import load_current_user, forget_current_token
 from app.utils.logger import get_logger
 from app.utils.response import success_response, error_response
 
@@ -32,22 +34,23 @@ def register():
         }
     """
     try:
-        data = request.get_json()
-        
         # 参数验证
-        username = data.get('username')
-        email = data.get('email')
-        password = data.get('password')
+        body = decode_body(RegisterRequest)
         
-        if not all([username, email, password]):
+        if body is None:
             return error_response(400, '用户名、邮箱和密码不能为空')
         
-        # 检查用户名是否已存在
-        if User.get_by_username(username):
+        username = body.username
+        email = body.email
+        password = body.password
+        
+        # 检查用户名和邮箱是否已存在（一次查询）
+        existing_users = User.get_by_username_or_email(username, email)
+        
+        if any(u.username == username for u in existing_users):
             return error_response(400, '用户名已被使用')
         
-        # 检查邮箱是否已存在
-        if User.get_by_email(email):
+        if any(u.email == email for u in existing_users):
             return error_response(400, '邮箱已被注册')
         
         # 创建用户
@@ -83,23 +86,19 @@ def login():
         }
     """
     try:
-        data = request.get_json()
-        
         # 参数验证
-        email = data.get('email')
-        password = data.get('password')
+        body = decode_body(LoginRequest)
         
-        if not all([email, password]):
+        if body is None:
             return error_response(400, '邮箱和密码不能为空')
         
-        # 查找用户
-        user = User.get_by_email(email)
+        email = body.email
+        password = body.password
         
-        if not user:
-            return error_response(401, '邮箱或密码错误')
+        # 查找用户并验证密码（用户不存在时同样计算一次哈希）
+        user = User.verify_credentials(email, password)
         
-        # 验证密码
-        if not user.check_password(password):
+        if not user:
             return error_response(401, '邮箱或密码错误')
         
         # 检查用户是否激活
@@ -112,14 +111,18 @@ def login():
         # 更新登录时间
         user.update_login_time()
         
+        # 先构建响应数据再提交，提交后对象过期会重新查询
+        data = {
+            'token': access_token,
+            'user': user.to_dict()
+        }
+        db.session.commit()
+        
         # 记录日志
-        logger.info(f"用户登录成功: {user.username} ({email})")
+        logger.info(f"用户登录成功: {data['user']['username']} ({email})")
         
         # 返回成功响应
-        return success_response({
-            'token': access_token,
-            'user': user.to_dict()
-        })
+        return success_response(data)
         
     except Exception as e:
         logger.error(f"登录失败: {str(e)}", exc_info=True)
@@ -137,8 +140,8 @@ def logout():
         # 获取当前用户ID
         user_id = int(get_jwt_identity())
         
-        # 这里可以将token加入黑名单（如果实现了token黑名单机制）
-        # 目前简单返回成功
+        # 移出JWT解码缓存（如果实现了token黑名单机制，也在这里加入黑名单）
+        forget_current_token()
         
         # 记录日志
         logger.info(f"用户登出: user_id={user_id}")
@@ -158,11 +161,8 @@ def get_current_user():
     需要JWT认证
     """
     try:
-        # 获取当前用户ID
-        user_id = int(get_jwt_identity())
-        
-        # 查找用户
-        user = User.get_by_id(user_id)
+        # 获取当前用户
+        user = load_current_user()
         
         if not user:
             return error_response(404, '用户不存在')
@@ -192,25 +192,22 @@ def change_password():
     """
     try:
         # 获取当前用户
-        user_id = int(get_jwt_identity())
-        user = User.get_by_id(user_id)
+        user = load_current_user()
         
         if not user:
             return error_response(404, '用户不存在')
         
-        data = request.get_json()
-        old_password = data.get('old_password')
-        new_password = data.get('new_password')
+        body = decode_body(ChangePasswordRequest)
         
-        if not all([old_password, new_password]):
+        if body is None:
             return error_response(400, '旧密码和新密码不能为空')
         
         # 验证旧密码
-        if not user.check_password(old_password):
+        if not user.check_password(body.old_password):
             return error_response(401, '旧密码错误')
         
         # 设置新密码
-        user.set_password(new_password)
+        user.set_password(body.new_password)
         user.save()
         
         # 记录日志
@@ -3,14 +3,28 @@ Prompt API
 处理Prompt相关的所有接口
 """
 
-from flask import Blueprint, request, jsonify
+import re
+import random
+import hashlib
+
+import orjson
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select, insert, update
+from sqlalchemy.orm import selectinload, joinedload, lazyload, raiseload, load_only
 
 from app.models.prompt import Prompt, PromptVersion
+from app.models.user import User
 from app.models.tag import Tag, PromptTag
+from app.models.collaboration import Collaboration
+from app.models.test_record import TestRecord
 from app.models.base import db
 from app.utils.logger import get_logger
-from app.utils.response import success_response, error_response, paginate_response
+from app.utils.cache import invalidate_namespace, swap_marker, delete_marker
+from app.utils.counters import incr_pending
+from app.utils.pagination import keyset_paginate
+from app.utils.tokens import count_tokens
+from app.utils.response import success_response, error_response, cursor_response
 
 # 创建蓝图
 prompts_bp = Blueprint('prompts', __name__)
@@ -18,18 +32,42 @@ prompts_bp = Blueprint('prompts', __name__)
 # 获取日志记录器
 logger = get_logger('prompts')
 
+# 每页数量上限
+MAX_PAGE_LIMIT = 100
+
+# 列表支持的排序字段
+PROMPT_SORT_COLUMNS = {
+    'created_at': Prompt.created_at,
+    'updated_at': Prompt.updated_at,
+    'star_count': Prompt.star_count,
+}
+
+
+def get_page_limit(default=20):
+    """
+    读取并限制每页数量参数
+    
+    参数:
+        default: 默认每页数量
+    
+    返回:
+        int: 1到MAX_PAGE_LIMIT之间的每页数量
+    """
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, MAX_PAGE_LIMIT))
+
 
 @prompts_bp.route('', methods=['GET'])
 @jwt_required()
 def get_prompts():
     """
     获取Prompt列表
-    支持分页、搜索、标签筛选
+    支持游标分页、搜索、标签筛选
     """
     try:
         # 获取查询参数
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 20, type=int)
+        cursor = request.args.get('cursor', '')
+        limit = get_page_limit()
         search = request.args.get('search', '')
         tags = request.args.get('tags', '')
         sort = request.args.get('sort', 'created_at')
@@ -45,28 +83,35 @@ def get_prompts():
         if search:
             query = Prompt.search(search, author_id=user_id)
         
-        # 标签筛选
+        # 只加载列表需要的列（内容截取为预览），预加载作者和标签（关联行与标签一次联表查询），
+        # 其余关系禁止懒加载，避免N+1查询
+        query = query.options(
+            *Prompt.list_options(),
+            selectinload(Prompt.author).load_only(User.id, User.username),
+            selectinload(Prompt.prompt_tags).joinedload(PromptTag.tag),
+            raiseload('*')
+        )
+        
+        # 标签筛选（EXISTS子查询，匹配多个标签时不会产生重复行）
         if tags:
             tag_ids = [int(t) for t in tags.split(',') if t.isdigit()]
             if tag_ids:
-                from app.models.tag import PromptTag
-                query = query.join(PromptTag).filter(PromptTag.tag_id.in_(tag_ids))
-        
-        # 排序
-        if sort == 'updated_at':
-            query = query.order_by(Prompt.updated_at.desc() if order == 'desc' else Prompt.updated_at.asc())
-        elif sort == 'star_count':
-            query = query.order_by(Prompt.star_count.desc() if order == 'desc' else Prompt.star_count.asc())
-        else:
-            query = query.order_by(Prompt.created_at.desc() if order == 'desc' else Prompt.created_at.asc())
-        
-        # 分页
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)
+                query = query.filter(Prompt.prompt_tags.any(PromptTag.tag_id.in_(tag_ids)))
+        
+        # 排序并分页，按 (排序字段, id) 从游标位置往后取
+        sort_column = PROMPT_SORT_COLUMNS.get(sort, Prompt.created_at)
+        try:
+            prompts, next_cursor = keyset_paginate(
+                query, sort_column, Prompt.id,
+                cursor=cursor, limit=limit, descending=(order == 'desc')
+            )
+        except ValueError:
+            return error_response(400, '无效的分页游标')
         
         # 构建响应数据
         items = []
-        for prompt in pagination.items:
-            item = prompt.to_dict(include_tags=True, include_author=True)
+        for prompt in prompts:
+            item = prompt.to_list_dict()
             item['stats'] = {
                 'view_count': prompt.view_count,
                 'test_count': prompt.test_count,
@@ -75,7 +120,7 @@ def get_prompts():
             }
             items.append(item)
         
-        return paginate_response(items, pagination)
+        return cursor_response(items, next_cursor, limit)
         
     except Exception as e:
         logger.error(f"获取Prompt列表失败: {str(e)}", exc_info=True)
@@ -91,21 +136,21 @@ def get_prompt(prompt_id):
     try:
         user_id = int(get_jwt_identity())
         
-        # 获取Prompt
-        prompt = Prompt.get_by_id(prompt_id)
+        # 获取Prompt及当前用户的权限，同时预加载作者、协作者和标签
+        prompt, permission = Prompt.fetch_with_permission(
+            prompt_id, user_id,
+            joinedload(Prompt.author),
+            selectinload(Prompt.collaborations).joinedload(Collaboration.user),
+            selectinload(Prompt.prompt_tags).joinedload(PromptTag.tag)
+        )
         
         if not prompt or prompt.is_deleted:
             return error_response(404, 'Prompt不存在')
         
         # 检查权限
-        from app.models.user import User
-        user = User.get_by_id(user_id)
-        if not user.has_permission(prompt_id, 'read'):
+        if not Prompt.permission_allows(permission, 'read'):
             return error_response(403, '无权限访问此Prompt')
         
-        # 增加查看次数
-        prompt.increment_view_count()
-        
         # 构建响应数据
         data = prompt.to_dict(include_tags=True, include_author=True)
         
@@ -115,7 +160,7 @@ def get_prompt(prompt_id):
             data['current_version'] = {
                 'id': current_version.id,
                 'version_number': current_version.version_number,
-                'created_at': current_version.created_at.isoformat()
+                'created_at': current_version.created_at
             }
         
         # 添加协作者信息
@@ -128,14 +173,24 @@ def get_prompt(prompt_id):
             })
         data['collaborators'] = collaborators
         
-        # 添加统计信息
+        # 增加查看次数：启用Redis时先累加在Redis中，由后台线程定期合并写库
+        pending_views = incr_pending('view', prompt.id, current_app._get_current_object())
+        
+        # 添加统计信息（查看次数按本次查看之后的值返回，包含尚未写库的部分）
+        data['view_count'] = prompt.view_count + (pending_views if pending_views is not None else 1)
         data['stats'] = {
-            'view_count': prompt.view_count,
+            'view_count': data['view_count'],
             'test_count': prompt.test_count,
             'star_count': prompt.star_count,
             'version_count': prompt.version_count
         }
         
+        # 未启用Redis时直接写库
+        # 提交会使已加载的对象过期，放在最后执行，避免重新加载预加载的关系
+        if pending_views is None:
+            prompt.increment_view_count()
+            db.session.commit()
+        
         return success_response(data)
         
     except Exception as e:
@@ -172,9 +227,10 @@ def create_prompt():
             description=description,
             author_id=user_id
         )
-        prompt.save()
+        db.session.add(prompt)
+        db.session.flush()
         
-        # 创建初始版本
+        # 创建初始版本，与Prompt在同一事务中提交
         prompt.create_version(
             title=title,
             content=content,
@@ -183,9 +239,24 @@ def create_prompt():
             author_id=user_id
         )
         
-        # 添加标签
-        for tag_id in tag_ids:
-            prompt.add_tag(tag_id)
+        # 批量添加标签，一次查询过滤掉不存在的标签
+        if tag_ids:
+            tag_ids = set(db.session.scalars(
+                select(Tag.id).where(Tag.id.in_(tag_ids))
+            ))
+        
+        if tag_ids:
+            db.session.execute(
+                insert(PromptTag),
+                [{'prompt_id': prompt.id, 'tag_id': tag_id} for tag_id in tag_ids]
+            )
+        
+        # Prompt、初始版本和标签在同一事务中提交
+        db.session.commit()
+        
+        # 标签使用次数有变化，清除标签列表缓存
+        if tag_ids:
+            invalidate_namespace('tags')
         
         # 记录日志
         logger.info(f"创建Prompt: {prompt.id} - {title}")
@@ -207,16 +278,18 @@ def update_prompt(prompt_id):
         user_id = int(get_jwt_identity())
         data = request.get_json()
         
-        # 获取Prompt
-        prompt = Prompt.get_by_id(prompt_id)
+        # 获取Prompt及当前用户的权限，并锁定Prompt行直到提交
+        # 并发修改同一Prompt时排队执行，变更判断基于最新内容
+        # 标签差集在数据库中计算（sync_tags），这里不预先加载标签集合，构造响应时再加载
+        prompt, permission = Prompt.fetch_with_permission(
+            prompt_id, user_id, lazyload(Prompt.prompt_tags), for_update=True
+        )
         
         if not prompt or prompt.is_deleted:
             return error_response(404, 'Prompt不存在')
         
         # 检查权限
-        from app.models.user import User
-        user = User.get_by_id(user_id)
-        if not user.has_permission(prompt_id, 'write'):
+        if not Prompt.permission_allows(permission, 'write'):
             return error_response(403, '无权限编辑此Prompt')
         
         # 获取更新数据
@@ -234,81 +307,41 @@ def update_prompt(prompt_id):
         )
         
         if has_change:
-            # 创建新版本（带重试机制处理并发冲突）
-            from sqlalchemy.exc import IntegrityError
-            retry_count = 0
-            max_retries = 3
+            # 创建新版本（版本号在行锁内分配，不会冲突）
+            prompt.create_version(
+                title=title,
+                content=content,
+                description=description,
+                change_summary=change_summary or '更新内容',
+                author_id=user_id
+            )
             
-            while retry_count < max_retries:
-                try:
-                    prompt.create_version(
-                        title=title,
-                        content=content,
-                        description=description,
-                        change_summary=change_summary or '更新内容',
-                        author_id=user_id
-                    )
-                    
-                    # 更新主记录
-                    prompt.title = title
-                    prompt.content = content
-                    prompt.description = description
-                    prompt.save()
-                    break  # 成功则退出循环
-                    
-                except IntegrityError as e:
-                    # 版本号冲突，重试
-                    db.session.rollback()
-                    retry_count += 1
-                    if retry_count >= max_retries:
-                        logger.error(f"版本创建失败（重试{max_retries}次后）: {str(e)}")
-                        return error_response(500, '版本创建失败，请稍后重试')
-                    logger.warning(f"版本号冲突，重试第{retry_count}次")
-        
-        # 更新标签
+            # 更新主记录（不提交事务）
+            prompt.title = title
+            prompt.content = content
+            prompt.description = description
+        
+        # 更新标签（差集在数据库中计算，不提交事务，使用次数由触发器维护）
+        tags_changed = False
         if tag_ids is not None:
-            # 获取当前标签ID列表
-            current_tag_ids = [pt.tag_id for pt in prompt.prompt_tags]
-            
-            # 计算需要删除和添加的标签
-            tags_to_remove = set(current_tag_ids) - set(tag_ids)
-            tags_to_add = set(tag_ids) - set(current_tag_ids)
-            
-            # 移除不需要的标签（不提交事务）
-            for tag_id in tags_to_remove:
-                pt = PromptTag.query.filter_by(
-                    prompt_id=prompt.id,
-                    tag_id=tag_id
-                ).first()
-                if pt:
-                    db.session.delete(pt)
-                    # 更新标签使用次数
-                    tag = Tag.get_by_id(tag_id)
-                    if tag:
-                        tag.decrement_use_count()
-            
-            # 添加新标签（不提交事务）
-            for tag_id in tags_to_add:
-                tag = Tag.get_by_id(tag_id)
-                if tag:
-                    prompt_tag = PromptTag(
-                        prompt_id=prompt.id,
-                        tag_id=tag_id
-                    )
-                    db.session.add(prompt_tag)
-                    # 更新标签使用次数
-                    tag.increment_use_count()
-            
-            # 统一提交所有更改
-            db.session.commit()
-            
-            # 刷新对象状态，确保标签关联正确加载
-            db.session.refresh(prompt)
+            tags_changed = prompt.sync_tags(tag_ids)
+        
+        # 提交前构造响应：事务内已能读到新的标签关联，提交后对象过期，不必再重新加载Prompt
+        # 先flush，updated_at等onupdate列在flush时才生成，否则响应中是修改前的值
+        db.session.flush()
+        data = prompt.to_dict(include_tags=True)
+        
+        # 版本、主记录和标签在同一事务中提交，同时释放行锁
+        db.session.commit()
+        
+        # 标签使用次数有变化，清除标签列表缓存
+        if tags_changed:
+            invalidate_namespace('tags')
         
         # 记录日志
-        logger.info(f"更新Prompt: {prompt.id}")
+        logger.info(f"更新Prompt: {data['id']}")
         
-        return success_response(prompt.to_dict(include_tags=True))
+        return success_response(data)
         
     except Exception as e:
         logger.error(f"更新Prompt失败: {str(e)}", exc_info=True)
@@ -336,6 +369,7 @@ def delete_prompt(prompt_id):
         
         # 软删除
         prompt.soft_delete()
+        db.session.commit()
         
         # 记录日志
         logger.info(f"删除Prompt: {prompt.id}")
@@ -352,30 +386,58 @@ def delete_prompt(prompt_id):
 def autosave_prompt(prompt_id):
     """
     自动保存Prompt（不创建新版本）
+    只更新标题和内容两列，相同内容在短时间内重复提交时直接返回
     """
     try:
         user_id = int(get_jwt_identity())
         data = request.get_json()
         
-        # 获取Prompt
-        prompt = Prompt.get_by_id(prompt_id)
+        # 获取Prompt及当前用户的权限（只加载权限检查需要的列，不加载标签等关系）
+        prompt, permission = Prompt.fetch_with_permission(
+            prompt_id, user_id,
+            load_only(Prompt.id, Prompt.author_id, Prompt.is_deleted, Prompt.version_count),
+            raiseload('*')
+        )
         
         if not prompt or prompt.is_deleted:
             return error_response(404, 'Prompt不存在')
         
         # 检查权限
-        from app.models.user import User
-        user = User.get_by_id(user_id)
-        if not user.has_permission(prompt_id, 'write'):
+        if not Prompt.permission_allows(permission, 'write'):
             return error_response(403, '无权限编辑此Prompt')
         
-        # 更新内容（不创建版本）
+        # 需要更新的列（不创建版本）
+        dirty = {}
         if 'title' in data:
-            prompt.title = data['title'].strip()
+            dirty['title'] = data['title'].strip()
         if 'content' in data:
-            prompt.content = data['content'].strip()
-        
-        prompt.save()
+            dirty['content'] = data['content'].strip()
+        
+        if not dirty:
+            return success_response({'message': '自动保存成功'})
+        
+        # 与去重窗口内上一次自动保存的内容相同，跳过写库
+        # 标记键包含版本号：更新和回滚都会创建新版本并改写内容，之后的自动保存不会被误判为重复
+        marker_key = f'autosave:{prompt_id}:{prompt.version_count}'
+        digest = hashlib.blake2b(
+            orjson.dumps(dirty, option=orjson.OPT_SORT_KEYS), digest_size=16
+        ).hexdigest()
+        if swap_marker(marker_key, digest, current_app.config['AUTOSAVE_DEDUP_SECONDS']) == digest:
+            return success_response({'message': '自动保存成功'})
+        
+        # 直接执行UPDATE，只写入变化的列
+        try:
+            db.session.execute(
+                update(Prompt)
+                .where(Prompt.id == prompt_id)
+                .values(**dirty)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception:
+            # 保存失败时清除标记，客户端重试时不会被当作重复请求
+            delete_marker(marker_key)
+            raise
         
         return success_response({'message': '自动保存成功'})
         
@@ -393,28 +455,39 @@ def get_prompt_versions(prompt_id):
     try:
         user_id = int(get_jwt_identity())
         
-        # 获取Prompt
-        prompt = Prompt.get_by_id(prompt_id)
+        # 获取Prompt及当前用户的权限
+        prompt, permission = Prompt.fetch_with_permission(prompt_id, user_id)
         
         if not prompt or prompt.is_deleted:
             return error_response(404, 'Prompt不存在')
         
         # 检查权限
-        from app.models.user import User
-        user = User.get_by_id(user_id)
-        if not user.has_permission(prompt_id, 'read'):
+        if not Prompt.permission_allows(permission, 'read'):
             return error_response(403, '无权限访问此Prompt')
         
         # 获取查询参数
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 20, type=int)
-        
-        # 获取版本列表
-        versions = prompt.versions.paginate(page=page, per_page=limit, error_out=False)
+        cursor = request.args.get('cursor', '')
+        limit = get_page_limit()
+        
+        # 获取版本列表（按版本号倒序），列表不需要版本内容，只加载摘要列，修改者一并联表查询
+        query = PromptVersion.query.filter_by(prompt_id=prompt.id).options(
+            load_only(
+                PromptVersion.id, PromptVersion.version_number, PromptVersion.title,
+                PromptVersion.change_summary, PromptVersion.created_at
+            ),
+            joinedload(PromptVersion.version_author).load_only(User.id, User.username)
+        )
+        try:
+            versions, next_cursor = keyset_paginate(
+                query, PromptVersion.version_number, PromptVersion.id,
+                cursor=cursor, limit=limit
+            )
+        except ValueError:
+            return error_response(400, '无效的分页游标')
         
         # 构建响应数据
         items = []
-        for version in versions.items:
+        for version in versions:
             items.append({
                 'id': version.id,
                 'version_number': version.version_number,
@@ -424,10 +497,10 @@ def get_prompt_versions(prompt_id):
                     'id': version.version_author.id,
                     'username': version.version_author.username
                 },
-                'created_at': version.created_at.isoformat()
+                'created_at': version.created_at
             })
         
-        return paginate_response(items, versions)
+        return cursor_response(items, next_cursor, limit)
         
     except Exception as e:
         logger.error(f"获取版本历史失败: {str(e)}", exc_info=True)
@@ -443,20 +516,17 @@ def get_prompt_version(prompt_id, version_id):
     try:
         user_id = int(get_jwt_identity())
         
-        # 获取Prompt
-        prompt = Prompt.get_by_id(prompt_id)
+        # 获取Prompt及当前用户的权限
+        prompt, permission = Prompt.fetch_with_permission(prompt_id, user_id)
         
         if not prompt or prompt.is_deleted:
             return error_response(404, 'Prompt不存在')
         
         # 检查权限
-        from app.models.user import User
-        user = User.get_by_id(user_id)
-        if not user.has_permission(prompt_id, 'read'):
+        if not Prompt.permission_allows(permission, 'read'):
             return error_response(403, '无权限访问此Prompt')
         
         # 获取版本
-        from app.models.prompt import PromptVersion
         version = PromptVersion.get_by_id(version_id)
         
         if not version or version.prompt_id != prompt_id:
@@ -474,7 +544,7 @@ def get_prompt_version(prompt_id, version_id):
                 'id': version.version_author.id,
                 'username': version.version_author.username
             },
-            'created_at': version.created_at.isoformat()
+            'created_at': version.created_at
         }
         
         return success_response(data)
@@ -494,16 +564,14 @@ def test_prompt(prompt_id):
         user_id = int(get_jwt_identity())
         data = request.get_json()
         
-        # 获取Prompt
-        prompt = Prompt.get_by_id(prompt_id)
+        # 获取Prompt及当前用户的权限
+        prompt, permission = Prompt.fetch_with_permission(prompt_id, user_id)
         
         if not prompt or prompt.is_deleted:
             return error_response(404, 'Prompt不存在')
         
         # 检查权限
-        from app.models.user import User
-        user = User.get_by_id(user_id)
-        if not user.has_permission(prompt_id, 'read'):
+        if not Prompt.permission_allows(permission, 'read'):
             return error_response(403, '无权限访问此Prompt')
         
         # 获取测试参数
@@ -512,53 +580,129 @@ def test_prompt(prompt_id):
         parameters = data.get('parameters', {})
         
         # TODO: 这里应该调用实际的AI API
-        # 目前返回模拟数据
-        import time
-        import random
-        
-        # 模拟响应时间
-        response_time = round(random.uniform(0.5, 2.0), 3)
-        time.sleep(0.5)  # 模拟网络延迟
-        
-        # 模拟响应
-        test_output = f"这是{model}模型的测试响应。\n\nPrompt内容：\n{prompt.content}\n\n"
-        if test_input:
-            test_output += f"测试输入：\n{test_input}\n\n"
-        test_output += "模拟输出：这是一个模拟的AI响应，实际使用时会调用真实的AI API。"
-        
-        # 记录测试
-        from app.models.test_record import TestRecord
-        test_record = TestRecord(
-            prompt_id=prompt_id,
-            user_id=user_id,
-            model_name=model,
-            model_params=parameters,
-            input_tokens=len(prompt.content.split()) + len(test_input.split()),
-            output_tokens=len(test_output.split()),
-            response_time=response_time,
-            test_input=test_input,
-            test_output=test_output,
-            status='success'
-        )
-        test_record.save()
-        
-        # 更新Prompt测试次数
-        prompt.increment_test_count()
+        # 目前返回模拟数据，模型输出按片段生成
+        chunks = _mock_completion(model, prompt.content, test_input)
+        
+        # 客户端请求SSE时逐段推送输出，否则生成完整输出后一次返回
+        if request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream' \
+                or request.args.get('stream') == '1':
+            return Response(
+                stream_with_context(_stream_test_events(
+                    chunks, prompt, user_id, model, parameters, test_input
+                )),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        test_output = ''.join(chunks)
+        result = _save_test_result(prompt, user_id, model, parameters, test_input, test_output)
         
         # 返回结果
-        return success_response({
-            'test_id': test_record.id,
-            'model': model,
-            'input': test_input,
-            'output': test_output,
-            'tokens': {
-                'input': test_record.input_tokens,
-                'output': test_record.output_tokens
-            },
-            'response_time': response_time,
-            'created_at': test_record.created_at.isoformat()
-        })
+        return success_response(result)
+        
+    except Exception as e:
+        logger.error(f"测试Prompt失败: {str(e)}", exc_info=True)
+        return error_response(500, '测试失败')
+
+
+def _mock_completion(model, content, test_input):
+    """
+    生成模拟的模型输出
+    
+    参数:
+        model: 模型名称
+        content: Prompt内容
+        test_input: 测试输入
+    
+    返回:
+        生成器，逐段产出输出文本
+    """
+    test_output = f"这是{model}模型的测试响应。\n\nPrompt内容：\n{content}\n\n"
+    if test_input:
+        test_output += f"测试输入：\n{test_input}\n\n"
+    test_output += "模拟输出：这是一个模拟的AI响应，实际使用时会调用真实的AI API。"
+    
+    # 按词切分并保留空白，拼接后与完整输出一致
+    for match in re.finditer(r'\s*\S+\s*', test_output):
+        yield match.group()
+
+
+def _save_test_result(prompt, user_id, model, parameters, test_input, test_output):
+    """
+    保存测试记录并更新Prompt测试次数
+    
+    参数:
+        prompt: Prompt实例
+        user_id: 测试用户ID
+        model: 模型名称
+        parameters: 模型参数
+        test_input: 测试输入
+        test_output: 模型输出
+    
+    返回:
+        dict: 测试结果
+    """
+    # 模拟响应时间
+    response_time = round(random.uniform(0.5, 2.0), 3)
+    
+    # 记录测试
+    test_record = TestRecord(
+        prompt_id=prompt.id,
+        user_id=user_id,
+        model_name=model,
+        model_params=parameters,
+        input_tokens=count_tokens(prompt.content, model) + count_tokens(test_input, model),
+        output_tokens=count_tokens(test_output, model),
+        response_time=response_time,
+        test_input=test_input,
+        test_output=test_output,
+        status='success'
+    )
+    db.session.add(test_record)
+    
+    # 更新Prompt测试次数，与测试记录一起提交
+    prompt.increment_test_count()
+    db.session.commit()
+    
+    return {
+        'test_id': test_record.id,
+        'model': model,
+        'input': test_input,
+        'output': test_output,
+        'tokens': {
+            'input': test_record.input_tokens,
+            'output': test_record.output_tokens
+        },
+        'response_time': response_time,
+        'created_at': test_record.created_at
+    }
+
+
+def _stream_test_events(chunks, prompt, user_id, model, parameters, test_input):
+    """
+    以SSE事件流推送模型输出
+    每个输出片段一个data事件，输出结束后保存测试记录并发送done事件
+    
+    参数:
+        chunks: 输出片段生成器
+        prompt: Prompt实例
+        user_id: 测试用户ID
+        model: 模型名称
+        parameters: 模型参数
+        test_input: 测试输入
+    
+    返回:
+        生成器，产出SSE格式的字符串
+    """
+    output = []
+    try:
+        for chunk in chunks:
+            output.append(chunk)
+            yield f"data: {orjson.dumps({'delta': chunk}).decode('utf-8')}\n\n"
+        
+        result = _save_test_result(prompt, user_id, model, parameters, test_input, ''.join(output))
+        yield f"event: done\ndata: {orjson.dumps(result).decode('utf-8')}\n\n"
         
     except Exception as e:
         logger.error(f"测试Prompt失败: {str(e)}", exc_info=True)
-        return error_response(500, '测试失败')
\ No newline at end of file
+        yield f"event: error\ndata: {orjson.dumps({'message': '测试失败'}).decode('utf-8')}\n\n"
@@ -0,0 +1,54 @@
+"""
+请求体结构定义
+使用msgspec在一次解码中完成JSON解析和字段类型校验
+"""
+
+from typing import Annotated
+
+import msgspec
+from flask import request
+
+# 非空字符串
+NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+
+class RegisterRequest(msgspec.Struct):
+    """注册请求体"""
+    username: NonEmptyStr
+    email: NonEmptyStr
+    password: NonEmptyStr
+
+
+class LoginRequest(msgspec.Struct):
+    """登录请求体"""
+    email: NonEmptyStr
+    password: NonEmptyStr
+
+
+class ChangePasswordRequest(msgspec.Struct):
+    """修改密码请求体"""
+    old_password: NonEmptyStr
+    new_password: NonEmptyStr
+
+
+# 解码器预先创建，避免每次请求重新解析类型定义
+_decoders = {
+    body_type: msgspec.json.Decoder(body_type)
+    for body_type in (RegisterRequest, LoginRequest, ChangePasswordRequest)
+}
+
+
+def decode_body(body_type):
+    """
+    解码并校验当前请求体
+    
+    参数:
+        body_type: 请求体结构类型
+    
+    返回:
+        请求体结构实例，JSON格式错误或字段校验失败时返回None
+    """
+    try:
+        return _decoders[body_type].decode(request.get_data())
+    except msgspec.DecodeError:
+        return None
@@ -3,11 +3,12 @@
 处理标签相关的接口
 """
 
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app.models.tag import Tag
 from app.models.base import db
+from app.utils.cache import cached, invalidate_namespace
 from app.utils.logger import get_logger
 from app.utils.response import success_response, error_response
 
@@ -28,14 +29,17 @@ def get_tags():
         # 获取查询参数
         category = request.args.get('category')
         
-        # 查询标签
+        # 查询标签（优先读缓存）
         if category:
-            tags = Tag.get_by_category(category)
+            data = cached(
+                'tags', ('cat', category), current_app.config['TAG_CACHE_TTL'],
+                lambda: [tag.to_dict() for tag in Tag.get_by_category(category)]
+            )
         else:
-            tags = Tag.get_all()
-        
-        # 构建响应数据
-        data = [tag.to_dict() for tag in tags]
+            data = cached(
+                'tags', ('all',), current_app.config['TAG_CACHE_TTL'],
+                lambda: [tag.to_dict() for tag in Tag.get_all()]
+            )
         
         return success_response(data)
         
@@ -54,11 +58,11 @@ def get_popular_tags():
         # 获取限制数量
         limit = request.args.get('limit', 10, type=int)
         
-        # 获取热门标签
-        tags = Tag.get_popular(limit)
-        
-        # 构建响应数据
-        data = [tag.to_dict() for tag in tags]
+        # 获取热门标签（优先读缓存）
+        data = cached(
+            'tags', ('popular', limit), current_app.config['TAG_CACHE_TTL'],
+            lambda: [tag.to_dict() for tag in Tag.get_popular(limit)]
+        )
         
         return success_response(data)
         
@@ -93,6 +97,9 @@ def create_tag():
             created_by=user_id
         )
         
+        # 清除标签列表缓存
+        invalidate_namespace('tags')
+        
         # 记录日志
         logger.info(f"创建标签: {tag.name}")
         
@@ -127,6 +134,9 @@ def delete_tag(tag_id):
         # 删除标签
         tag.delete()
         
+        # 清除标签列表缓存
+        invalidate_namespace('tags')
+        
         # 记录日志
         logger.info(f"用户 {user_id} 删除标签: {tag.name}")
         
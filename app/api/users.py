@@ -3,12 +3,14 @@
 处理用户设置等用户相关接口
 """
 
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app.models.user import User
 from app.models.user_setting import UserSetting
 from app.models.base import db
+from app.utils.auth import load_current_user
+from app.utils.cache import cached, invalidate_key
 from app.utils.logger import get_logger
 from app.utils.response import success_response, error_response
 
@@ -28,14 +30,13 @@ def get_user_settings():
     try:
         user_id = int(get_jwt_identity())
         
-        # 获取用户设置
-        settings = UserSetting.get_user_settings(user_id)
-        
-        if not settings:
-            # 创建默认设置
-            settings = UserSetting.create_default_settings(user_id)
+        # 用户设置按用户缓存（启用Redis时），修改设置时清除
+        data = cached(
+            'user_settings', (user_id,), current_app.config['USER_SETTINGS_CACHE_TTL'],
+            lambda: _load_user_settings(user_id)
+        )
         
-        return success_response(settings.to_dict())
+        return success_response(data)
         
     except Exception as e:
         logger.error(f"获取用户设置失败: {str(e)}", exc_info=True)
@@ -52,6 +53,16 @@ def update_user_settings():
         user_id = int(get_jwt_identity())
         data = request.get_json()
         
+        # 先校验再修改（创建默认设置和update_*方法会直接写库）
+        if 'background_music' in data and not UserSetting.is_valid_background_music(data['background_music']):
+            return error_response(400, '无效的背景音乐')
+        
+        if 'editor_theme' in data and not UserSetting.is_valid_theme(data['editor_theme']):
+            return error_response(400, '无效的编辑器主题')
+        
+        if 'keyboard_shortcuts' in data and not UserSetting.is_valid_shortcuts(data['keyboard_shortcuts']):
+            return error_response(400, '快捷键配置格式错误')
+        
         # 获取用户设置
         settings = UserSetting.get_user_settings(user_id)
         
@@ -82,6 +93,9 @@ def update_user_settings():
         
         settings.save()
         
+        # 清除该用户的设置缓存
+        invalidate_key('user_settings', user_id)
+        
         # 记录日志
         logger.info(f"更新用户设置: user_id={user_id}")
         
@@ -99,10 +113,8 @@ def get_user_profile():
     获取用户个人资料
     """
     try:
-        user_id = int(get_jwt_identity())
-        
-        # 获取用户
-        user = User.get_by_id(user_id)
+        # 获取当前用户（同一请求内只查询一次）
+        user = load_current_user()
         
         if not user:
             return error_response(404, '用户不存在')
@@ -125,11 +137,10 @@ def update_user_profile():
     更新用户个人资料
     """
     try:
-        user_id = int(get_jwt_identity())
         data = request.get_json()
         
-        # 获取用户
-        user = User.get_by_id(user_id)
+        # 获取当前用户（同一请求内只查询一次）
+        user = load_current_user()
         
         if not user:
             return error_response(404, '用户不存在')
@@ -139,7 +150,7 @@ def update_user_profile():
             # 检查用户名是否已被使用
             username = data['username'].strip()
             existing = User.get_by_username(username)
-            if existing and existing.id != user_id:
+            if existing and existing.id != user.id:
                 return error_response(400, '用户名已被使用')
             user.username = username
         
@@ -147,7 +158,11 @@ def update_user_profile():
             user.avatar_url = data['avatar_url']
         
         if 'theme_preference' in data:
-            user.theme_preference = data['theme_preference']
+            # 列类型为MutableDict，只接受对象或null
+            theme_preference = data['theme_preference']
+            if theme_preference is not None and not isinstance(theme_preference, dict):
+                return error_response(400, '主题偏好设置格式错误')
+            user.theme_preference = theme_preference
         
         user.save()
         
@@ -158,4 +173,23 @@ def update_user_profile():
         
     except Exception as e:
         logger.error(f"更新用户资料失败: {str(e)}", exc_info=True)
-        return error_response(500, '更新用户资料失败')
\ No newline at end of file
+        return error_response(500, '更新用户资料失败')
+
+
+def _load_user_settings(user_id):
+    """
+    从数据库读取用户设置，不存在时创建默认设置
+    
+    参数:
+        user_id: 用户ID
+    
+    返回:
+        dict: 用户设置字典
+    """
+    settings = UserSetting.get_user_settings(user_id)
+    
+    if not settings:
+        # 创建默认设置
+        settings = UserSetting.create_default_settings(user_id)
+    
+    return settings.to_dict()
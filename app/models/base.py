@@ -3,12 +3,58 @@
 所有数据模型的基类，提供通用字段和方法
 """
 
+import zlib
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 
 # 创建数据库实例
+# 连接池参数由配置中的 SQLALCHEMY_ENGINE_OPTIONS 提供（见 config/config.py）：
+# 默认 pool_size=10、max_overflow=20，并发请求不必排队等待借出连接；
+# pool_pre_ping 在借出前检测连接，数据库重启或连接被服务端断开后自动重连；
+# pool_recycle 需小于MySQL的 wait_timeout。
+# 使用gunicorn多进程部署时每个worker各有一个连接池，
+# 总连接数约为 workers * (pool_size + max_overflow)，需低于MySQL的 max_connections
 db = SQLAlchemy()
 
+# 压缩存储的文本：不小于此字节数的内容才压缩，短文本压缩收益小
+COMPRESS_MIN_SIZE = 1024
+
+# 压缩数据的前缀，与未压缩的UTF-8文本区分（正常文本不以NUL字符开头）
+COMPRESSED_PREFIX = b'\x00z'
+
+
+class CompressedText(db.TypeDecorator):
+    """
+    zlib压缩存储的长文本列（数据库中为BLOB）
+    写入时超过 COMPRESS_MIN_SIZE 且压缩后更小的内容加前缀压缩存储，其余按UTF-8原样存储；
+    读取时按前缀判断是否需要解压，原有未压缩的数据可以直接读取
+    """
+    
+    impl = db.LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        """写入前编码并按需压缩"""
+        if value is None:
+            return None
+        
+        data = value.encode('utf-8')
+        if len(data) >= COMPRESS_MIN_SIZE:
+            compressed = COMPRESSED_PREFIX + zlib.compress(data)
+            if len(compressed) < len(data):
+                return compressed
+        return data
+    
+    def process_result_value(self, value, dialect):
+        """读取后按需解压并解码"""
+        if value is None:
+            return None
+        
+        value = bytes(value)
+        if value.startswith(COMPRESSED_PREFIX):
+            value = zlib.decompress(value[len(COMPRESSED_PREFIX):])
+        return value.decode('utf-8')
+
 
 class BaseModel(db.Model):
     """
@@ -51,6 +97,17 @@ class BaseModel(db.Model):
             db.session.rollback()
             raise e
     
+    def stage(self):
+        """
+        将修改加入会话，不提交事务
+        同一请求中的多个修改由调用方统一提交一次（工作单元），避免每个修改各提交一次
+        
+        返回:
+            模型实例本身
+        """
+        db.session.add(self)
+        return self
+    
     def delete(self):
         """
         从数据库删除记录
@@ -84,24 +141,44 @@ class BaseModel(db.Model):
             exclude: 要排除的字段列表
         
         返回:
-            字典格式的模型数据
-        """
-        if exclude is None:
-            exclude = []
-        
-        data = {}
-        for column in self.__table__.columns:
-            if column.name not in exclude:
-                value = getattr(self, column.name)
-                
-                # 处理特殊类型
-                if isinstance(value, datetime):
-                    value = value.isoformat()
-                
-                data[column.name] = value
+            字典格式的模型数据，DateTime列保留datetime对象，由orjson序列化为ISO格式
+        """
+        serializer = type(self).__dict__.get('_dict_serializer')
+        if serializer is None:
+            serializer = type(self)._build_dict_serializer()
+        
+        data = serializer(self)
+        
+        if exclude:
+            for name in exclude:
+                data.pop(name, None)
         
         return data
     
+    @classmethod
+    def _build_dict_serializer(cls):
+        """
+        为模型类生成专用的序列化函数
+        按表结构生成直接读取各列属性的函数体，避免每次调用都遍历列。
+        生成结果缓存在类上
+        
+        返回:
+            函数: serializer(instance) -> dict
+        """
+        lines = ['def serializer(self):', '    return {']
+        for column in cls.__table__.columns:
+            name = column.name
+            value = f'self.{name}' if name.isidentifier() else f'getattr(self, {name!r})'
+            lines.append(f'        {name!r}: {value},')
+        lines.append('    }')
+        
+        namespace = {}
+        code = compile('\n'.join(lines), f'<{cls.__name__}.to_dict>', 'exec')
+        exec(code, namespace)
+        
+        cls._dict_serializer = namespace['serializer']
+        return cls._dict_serializer
+    
     @classmethod
     def get_by_id(cls, id):
         """
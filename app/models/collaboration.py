@@ -3,9 +3,20 @@
 定义协作权限表结构
 """
 
+from datetime import datetime
+
 from .base import db, BaseModel
 
 
+# 各操作要求的权限：作者（owner）拥有全部权限，协作者按协作权限级别判断
+# 每种要求对应的可接受权限集合预先计算好，检查时只需一次集合成员判断
+PERMISSION_LEVELS = {
+    'read': frozenset(['owner', 'admin', 'write', 'read']),
+    'write': frozenset(['owner', 'admin', 'write']),
+    'admin': frozenset(['owner', 'admin']),
+}
+
+
 class Collaboration(BaseModel):
     """协作权限模型"""
     
@@ -50,26 +61,35 @@ class Collaboration(BaseModel):
     )
     
     # 关系定义
+    # 协作用户
+    user = db.relationship(
+        'User',
+        back_populates='collaborations',
+        foreign_keys=[user_id]
+    )
+    
+    # 邀请者
     inviter = db.relationship(
         'User',
         backref='sent_invitations',
         foreign_keys=[invited_by]
     )
     
-    # 唯一约束
+    # 唯一约束和索引
     __table_args__ = (
         db.UniqueConstraint('prompt_id', 'user_id', name='uk_prompt_user'),
+        # 查询用户已接受的协作时按索引范围扫描
+        db.Index('idx_collaborations_user_accepted', 'user_id', 'accepted_at'),
     )
     
     def accept_invitation(self):
-        """接受邀请"""
-        from datetime import datetime
+        """接受邀请（不提交事务）"""
         self.accepted_at = datetime.utcnow()
-        self.save()
+        self.stage()
     
     def update_permission(self, new_permission):
         """
-        更新权限级别
+        更新权限级别（不提交事务）
         
         参数:
             new_permission: 新的权限级别 ('read', 'write', 'admin')
@@ -77,12 +97,11 @@ class Collaboration(BaseModel):
         返回:
             bool: 是否成功
         """
-        valid_permissions = ['read', 'write', 'admin']
-        if new_permission not in valid_permissions:
+        if new_permission not in PERMISSION_LEVELS:
             return False
         
         self.permission = new_permission
-        self.save()
+        self.stage()
         return True
     
     def has_permission(self, required_permission):
@@ -95,16 +114,7 @@ class Collaboration(BaseModel):
         返回:
             bool: 是否有权限
         """
-        permission_hierarchy = {
-            'read': 1,
-            'write': 2,
-            'admin': 3
-        }
-        
-        current_level = permission_hierarchy.get(self.permission, 0)
-        required_level = permission_hierarchy.get(required_permission, 999)
-        
-        return current_level >= required_level
+        return self.permission in PERMISSION_LEVELS.get(required_permission, ())
     
     @classmethod
     def get_user_collaborations(cls, user_id):
@@ -117,7 +127,7 @@ class Collaboration(BaseModel):
         返回:
             Collaboration列表
         """
-        return cls.query.filter_by(user_id=user_id, accepted_at__ne=None).all()
+        return cls.query.filter(cls.user_id == user_id, cls.accepted_at.isnot(None)).all()
     
     @classmethod
     def get_prompt_collaborators(cls, prompt_id):
@@ -145,18 +155,12 @@ class Collaboration(BaseModel):
         返回:
             bool: 是否有权限
         """
-        collaboration = cls.query.filter_by(
-            prompt_id=prompt_id,
-            user_id=user_id
-        ).first()
-        
-        if not collaboration:
-            # 检查是否是作者
-            from .prompt import Prompt
-            prompt = Prompt.get_by_id(prompt_id)
-            return prompt and prompt.author_id == user_id
+        # prompt模块在顶层导入了本模块，此处延迟导入避免循环
+        from .prompt import Prompt
         
-        return collaboration.has_permission(required_permission)
+        # 作者和协作权限一次查询得到
+        permission = Prompt.get_permission(prompt_id, user_id)
+        return Prompt.permission_allows(permission, required_permission)
     
     def __repr__(self):
         """返回协作的字符串表示"""
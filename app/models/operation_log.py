@@ -3,8 +3,18 @@
 定义操作日志表结构
 """
 
+import time
+from datetime import datetime, timedelta
+
+from app.utils.pagination import seek_before
 from .base import db, BaseModel
 
+# 清理旧日志时每批删除的数量，每批单独提交，避免长时间锁表和大事务
+CLEANUP_BATCH_SIZE = 5000
+
+# 批次之间的间隔（秒），给复制和其他写入留出空隙
+CLEANUP_BATCH_INTERVAL = 0.1
+
 
 class OperationLog(BaseModel):
     """操作日志模型"""
@@ -68,10 +78,18 @@ class OperationLog(BaseModel):
         comment='用户代理'
     )
     
+    # 操作用户
+    user = db.relationship(
+        'User',
+        back_populates='operation_logs'
+    )
+    
     # 索引定义
+    # 按用户、按目标查询时都按 created_at 倒序取最近的记录，复合索引使排序和LIMIT直接走索引；
+    # InnoDB二级索引隐含主键，idx_created_at 即 (created_at, id)，供最近活动查询和清理旧日志使用
     __table_args__ = (
-        db.Index('idx_user_id', 'user_id'),
-        db.Index('idx_target', 'target_type', 'target_id'),
+        db.Index('idx_user_created', 'user_id', 'created_at'),
+        db.Index('idx_target_created', 'target_type', 'target_id', 'created_at'),
         db.Index('idx_created_at', 'created_at'),
     )
     
@@ -92,11 +110,33 @@ class OperationLog(BaseModel):
     TARGET_USER = 'user'
     TARGET_SETTING = 'setting'
     
+    # 操作类型、目标类型的描述文本，类定义时构建一次
+    ACTION_DESCRIPTIONS = {
+        ACTION_CREATE: '创建',
+        ACTION_UPDATE: '更新',
+        ACTION_DELETE: '删除',
+        ACTION_READ: '查看',
+        ACTION_TEST: '测试',
+        ACTION_SHARE: '分享',
+        ACTION_LOGIN: '登录',
+        ACTION_LOGOUT: '登出'
+    }
+    
+    TARGET_DESCRIPTIONS = {
+        TARGET_PROMPT: 'Prompt',
+        TARGET_VERSION: '版本',
+        TARGET_TAG: '标签',
+        TARGET_USER: '用户',
+        TARGET_SETTING: '设置'
+    }
+    
     @classmethod
     def log_action(cls, user_id, action_type, target_type, target_id, 
                   detail=None, ip_address=None, user_agent=None):
         """
         记录操作日志
+        只加入会话，不提交事务：调用方必须在之后调用 db.session.commit()，
+        日志随调用方的业务修改一起提交，未提交时请求结束后日志会被丢弃
         
         参数:
             user_id: 操作用户ID
@@ -119,22 +159,22 @@ class OperationLog(BaseModel):
             ip_address=ip_address,
             user_agent=user_agent
         )
-        log.save()
-        return log
+        return log.stage()
     
     @classmethod
-    def get_user_logs(cls, user_id, limit=None):
+    def get_user_logs(cls, user_id, limit=None, before=None):
         """
         获取用户的操作日志
         
         参数:
             user_id: 用户ID
             limit: 返回数量限制
+            before: 上一页最后一条记录的 (created_at, id)，用于翻页
         
         返回:
             OperationLog列表
         """
-        query = cls.query.filter_by(user_id=user_id).order_by(cls.created_at.desc())
+        query = seek_before(cls.query.filter_by(user_id=user_id), cls.created_at, cls.id, before)
         
         if limit:
             query = query.limit(limit)
@@ -142,7 +182,7 @@ class OperationLog(BaseModel):
         return query.all()
     
     @classmethod
-    def get_target_logs(cls, target_type, target_id, limit=None):
+    def get_target_logs(cls, target_type, target_id, limit=None, before=None):
         """
         获取特定目标的操作日志
         
@@ -150,6 +190,7 @@ class OperationLog(BaseModel):
             target_type: 目标类型
             target_id: 目标ID
             limit: 返回数量限制
+            before: 上一页最后一条记录的 (created_at, id)，用于翻页
         
         返回:
             OperationLog列表
@@ -157,7 +198,8 @@ class OperationLog(BaseModel):
         query = cls.query.filter_by(
             target_type=target_type,
             target_id=target_id
-        ).order_by(cls.created_at.desc())
+        )
+        query = seek_before(query, cls.created_at, cls.id, before)
         
         if limit:
             query = query.limit(limit)
@@ -165,38 +207,57 @@ class OperationLog(BaseModel):
         return query.all()
     
     @classmethod
-    def get_recent_activities(cls, limit=50):
+    def get_recent_activities(cls, limit=50, before=None):
         """
         获取最近的活动日志
         
         参数:
             limit: 返回数量限制
+            before: 上一页最后一条记录的 (created_at, id)，用于翻页
         
         返回:
             OperationLog列表
         """
-        return cls.query.order_by(cls.created_at.desc()).limit(limit).all()
+        return seek_before(cls.query, cls.created_at, cls.id, before).limit(limit).all()
     
     @classmethod
-    def cleanup_old_logs(cls, days=90):
+    def cleanup_old_logs(cls, days=90, batch_size=CLEANUP_BATCH_SIZE):
         """
         清理旧日志
+        分批删除：每批按 idx_created_at 取出一批ID再按主键删除，每批单独提交，
+        不再预先COUNT，直到没有可删除的记录
         
         参数:
             days: 保留天数
+            batch_size: 每批删除的数量
         
         返回:
             int: 删除的记录数
         """
-        from datetime import datetime, timedelta
-        
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        old_logs = cls.query.filter(cls.created_at < cutoff_date)
-        count = old_logs.count()
-        old_logs.delete()
+        batch_stmt = (
+            db.select(cls.id)
+            .where(cls.created_at < cutoff_date)
+            .order_by(cls.created_at, cls.id)
+            .limit(batch_size)
+        )
+        
+        count = 0
+        while True:
+            ids = db.session.scalars(batch_stmt).all()
+            if ids:
+                db.session.execute(
+                    db.delete(cls).where(cls.id.in_(ids)),
+                    execution_options={'synchronize_session': False}
+                )
+            db.session.commit()
+            count += len(ids)
+            
+            if len(ids) < batch_size:
+                break
+            time.sleep(CLEANUP_BATCH_INTERVAL)
         
-        db.session.commit()
         return count
     
     def get_action_description(self):
@@ -206,27 +267,8 @@ class OperationLog(BaseModel):
         返回:
             str: 操作描述
         """
-        action_descriptions = {
-            self.ACTION_CREATE: '创建',
-            self.ACTION_UPDATE: '更新',
-            self.ACTION_DELETE: '删除',
-            self.ACTION_READ: '查看',
-            self.ACTION_TEST: '测试',
-            self.ACTION_SHARE: '分享',
-            self.ACTION_LOGIN: '登录',
-            self.ACTION_LOGOUT: '登出'
-        }
-        
-        target_descriptions = {
-            self.TARGET_PROMPT: 'Prompt',
-            self.TARGET_VERSION: '版本',
-            self.TARGET_TAG: '标签',
-            self.TARGET_USER: '用户',
-            self.TARGET_SETTING: '设置'
-        }
-        
-        action = action_descriptions.get(self.action_type, self.action_type)
-        target = target_descriptions.get(self.target_type, self.target_type)
+        action = self.ACTION_DESCRIPTIONS.get(self.action_type, self.action_type)
+        target = self.TARGET_DESCRIPTIONS.get(self.target_type, self.target_type)
         
         return f"{action}{target} #{self.target_id}"
     
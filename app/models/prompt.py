@@ -3,7 +3,34 @@ Prompt模型
 定义Prompt表和版本表结构
 """
 
-from .base import db, BaseModel
+import difflib
+import threading
+from datetime import datetime
+
+from cachetools import LRUCache
+from flask import g, has_app_context
+from sqlalchemy import DDL, event, func
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session, query_expression, with_expression, load_only
+
+from app.utils.cache import cached
+from .base import db, BaseModel, CompressedText
+from .tag import Tag, PromptTag
+from .collaboration import Collaboration, PERMISSION_LEVELS
+
+
+# 列表页内容预览的字符数
+PREVIEW_LENGTH = 100
+
+# 版本差异缓存：版本写入后不再修改，差异结果按 (旧版本ID, 新版本ID) 缓存，不需要失效
+# 进程内LRU缓存最近使用的差异，启用Redis时在进程间共享
+DIFF_CACHE_SIZE = 1024
+DIFF_CACHE_TTL = 7 * 24 * 3600
+_diff_cache = LRUCache(maxsize=DIFF_CACHE_SIZE)
+_diff_cache_lock = threading.Lock()
+
+# 全文索引ngram分词长度（与MySQL的 ngram_token_size 一致），更短的关键词无法走全文索引
+NGRAM_TOKEN_SIZE = 2
 
 
 class Prompt(BaseModel):
@@ -75,10 +102,11 @@ class Prompt(BaseModel):
         comment='收藏次数'
     )
     
-    # 版本数量
+    # 版本数量，即最新版本的版本号，由create_version维护（新建时为0，创建初始版本后为1）
+    # 已有数据库需执行 migrations/010 按版本记录校正
     version_count = db.Column(
         db.Integer,
-        default=1,
+        default=0,
         comment='版本数量'
     )
     
@@ -89,7 +117,27 @@ class Prompt(BaseModel):
         comment='最后测试时间'
     )
     
+    # 索引
+    __table_args__ = (
+        # 列表页按作者筛选并按 (排序字段, id) 游标分页，每种排序各一个索引，避免filesort
+        db.Index('idx_prompts_author_created', 'author_id', 'is_deleted', 'created_at', 'id'),
+        db.Index('idx_prompts_author_updated', 'author_id', 'is_deleted', 'updated_at', 'id'),
+        db.Index('idx_prompts_author_star', 'author_id', 'is_deleted', 'star_count', 'id'),
+        # 关键词搜索使用全文索引，ngram分词支持中文
+        db.Index(
+            'ft_prompts_search', 'title', 'content', 'description',
+            mysql_prefix='FULLTEXT', mysql_with_parser='ngram'
+        ),
+    )
+    
     # 关系定义
+    # 作者
+    author = db.relationship(
+        'User',
+        back_populates='prompts',
+        foreign_keys=[author_id]
+    )
+    
     # 版本列表
     versions = db.relationship(
         'PromptVersion',
@@ -99,11 +147,11 @@ class Prompt(BaseModel):
         order_by='PromptVersion.version_number.desc()'
     )
     
-    # 标签关联
+    # 标签关联（数量有限且序列化时几乎总会用到，随Prompt一起以IN查询批量加载）
     prompt_tags = db.relationship(
         'PromptTag',
         backref='prompt',
-        lazy='dynamic',
+        lazy='selectin',
         cascade='all, delete-orphan'
     )
     
@@ -115,30 +163,61 @@ class Prompt(BaseModel):
         cascade='all, delete-orphan'
     )
     
-    # 协作权限
+    # 协作权限（普通集合，可在查询时通过selectinload预加载）
     collaborations = db.relationship(
         'Collaboration',
         backref='prompt',
-        lazy='dynamic',
+        lazy='select',
         cascade='all, delete-orphan'
     )
     
+    # 内容预览，仅在list_options()的查询中由数据库截取
+    content_preview = query_expression()
+    
+    # 列表页需要的列，不加载可能很长的content
+    LIST_COLUMNS = (
+        'id', 'title', 'description', 'author_id', 'is_public',
+        'view_count', 'test_count', 'star_count', 'version_count',
+        'last_tested_at', 'created_at', 'updated_at',
+    )
+    
     def increment_view_count(self):
-        """增加查看次数"""
-        self.view_count += 1
-        self.save()
+        """
+        增加查看次数
+        数据库端原子自增，不提交事务，由调用方提交
+        """
+        self._increment_counters(view_count=Prompt.view_count + 1)
     
     def increment_test_count(self):
-        """增加测试次数"""
-        from datetime import datetime
-        self.test_count += 1
-        self.last_tested_at = datetime.utcnow()
-        self.save()
+        """
+        增加测试次数并记录最后测试时间
+        数据库端原子自增，不提交事务，由调用方提交
+        """
+        self._increment_counters(
+            test_count=Prompt.test_count + 1,
+            last_tested_at=datetime.utcnow()
+        )
+    
+    def _increment_counters(self, **values):
+        """
+        以一条只包含计数列的UPDATE更新当前Prompt
+        并发请求不会丢失计数；计数不属于内容修改，保持updated_at不变
+        
+        参数:
+            **values: 列名 -> 新值表达式
+        """
+        table = Prompt.__table__
+        db.session.execute(
+            db.update(table)
+            .where(table.c.id == self.id)
+            .values(updated_at=table.c.updated_at, **values)
+        )
     
     def create_version(self, title=None, content=None, description=None, 
                       change_summary=None, author_id=None):
         """
         创建新版本
+        不提交事务，由调用方与主记录的修改一起提交，版本记录和主记录原子地保存
         
         参数:
             title: 版本标题
@@ -150,16 +229,17 @@ class Prompt(BaseModel):
         返回:
             PromptVersion实例
         """
-        # 使用数据库查询获取最大版本号，避免缓存问题
-        from sqlalchemy import func
-        max_version = db.session.query(func.max(PromptVersion.version_number)).filter(
-            PromptVersion.prompt_id == self.id
-        ).scalar()
+        # 锁定Prompt行并读取版本计数（MySQL: SELECT ... FOR UPDATE），
+        # 同一Prompt的版本号分配串行执行；加锁读取到的是已提交的最新值而不是事务快照，
+        # version_count 始终等于最新版本号，不需要再查询 max(version_number)
+        current_version = db.session.scalar(
+            db.select(Prompt.version_count).where(Prompt.id == self.id).with_for_update()
+        )
         
         # 计算下一个版本号
-        next_version_number = (max_version + 1) if max_version else 1
+        next_version_number = (current_version or 0) + 1
         
-        # 创建版本记录
+        # 创建版本记录（不提交事务）
         version = PromptVersion(
             prompt_id=self.id,
             version_number=next_version_number,
@@ -169,11 +249,10 @@ class Prompt(BaseModel):
             change_summary=change_summary,
             author_id=author_id or self.author_id
         )
-        version.save()
+        db.session.add(version)
         
         # 更新版本计数
         self.version_count = next_version_number
-        self.save()
         
         return version
     
@@ -184,7 +263,13 @@ class Prompt(BaseModel):
         返回:
             PromptVersion实例或None
         """
-        return self.versions.first()
+        # 沿 uk_prompt_version (prompt_id, version_number) 索引倒序取第一条
+        return db.session.scalar(
+            db.select(PromptVersion)
+            .where(PromptVersion.prompt_id == self.id)
+            .order_by(PromptVersion.version_number.desc())
+            .limit(1)
+        )
     
     def get_version_by_number(self, version_number):
         """
@@ -196,11 +281,17 @@ class Prompt(BaseModel):
         返回:
             PromptVersion实例或None
         """
-        return self.versions.filter_by(version_number=version_number).first()
+        # (prompt_id, version_number) 唯一，按唯一键直接查找，不需要排序和LIMIT
+        return db.session.scalar(
+            db.select(PromptVersion).where(
+                PromptVersion.prompt_id == self.id,
+                PromptVersion.version_number == version_number
+            )
+        )
     
     def rollback_to_version(self, version_id):
         """
-        回滚到指定版本
+        回滚到指定版本（不提交事务）
         
         参数:
             version_id: 版本ID
@@ -217,10 +308,11 @@ class Prompt(BaseModel):
         self.content = version.content
         self.description = version.description
         
-        # 创建新版本记录
+        # 创建新版本记录，与内容修改一起提交
         self.create_version(
             change_summary=f"回滚到版本 {version.version_number}"
         )
+        self.stage()
         
         return True
     
@@ -235,45 +327,37 @@ class Prompt(BaseModel):
     
     def add_tag(self, tag_id):
         """
-        添加标签
+        添加标签（不提交事务）
         
         参数:
             tag_id: 标签ID
         
         返回:
-            bool: 是否成功
+            bool: 是否成功（已有此标签也返回True，标签不存在返回False）
         """
-        from .tag import Tag, PromptTag
-        
-        # 检查标签是否存在
-        tag = Tag.get_by_id(tag_id)
-        if not tag:
-            return False
-        
-        # 检查是否已有此标签
-        existing = PromptTag.query.filter_by(
-            prompt_id=self.id,
-            tag_id=tag_id
-        ).first()
+        # 插入关联，已存在（唯一约束）或标签不存在（外键）时忽略，不预先查询
+        result = db.session.execute(
+            db.insert(PromptTag)
+            .values(prompt_id=self.id, tag_id=tag_id)
+            .prefix_with('IGNORE', dialect='mysql')
+            .prefix_with('OR IGNORE', dialect='sqlite')
+        )
         
-        if existing:
+        # 标签使用次数由 prompt_tags 的触发器维护
+        if result.rowcount == 1:
             return True
         
-        # 添加标签关联
-        prompt_tag = PromptTag(
-            prompt_id=self.id,
-            tag_id=tag_id
+        # 未插入：区分已有此标签和标签不存在
+        return db.session.scalar(
+            db.select(db.exists().where(
+                PromptTag.prompt_id == self.id,
+                PromptTag.tag_id == tag_id
+            ))
         )
-        prompt_tag.save()
-        
-        # 更新标签使用次数
-        tag.increment_use_count()
-        
-        return True
     
     def remove_tag(self, tag_id):
         """
-        移除标签
+        移除标签（不提交事务）
         
         参数:
             tag_id: 标签ID
@@ -281,28 +365,65 @@ class Prompt(BaseModel):
         返回:
             bool: 是否成功
         """
-        from .tag import PromptTag
+        # 直接删除关联，按影响行数判断是否存在，不预先查询（使用次数由触发器减少）
+        result = db.session.execute(
+            db.delete(PromptTag).where(
+                PromptTag.prompt_id == self.id,
+                PromptTag.tag_id == tag_id
+            ),
+            execution_options={'synchronize_session': False}
+        )
         
-        prompt_tag = PromptTag.query.filter_by(
-            prompt_id=self.id,
-            tag_id=tag_id
-        ).first()
+        return result.rowcount == 1
+    
+    def sync_tags(self, tag_ids):
+        """
+        将标签设置为给定列表（不提交事务）
+        差集在数据库中计算：一条DELETE移除列表外的关联，一条INSERT IGNORE添加列表内缺少的关联（已有的关联被忽略），
+        不预先查询当前标签；不存在的标签ID由一次单独的查询过滤
         
-        if prompt_tag:
-            prompt_tag.delete()
-            return True
+        注意: 写 prompt_tags 的语句不能读取 tags 表（如 INSERT ... SELECT FROM tags），
+        prompt_tags 的触发器会更新 tags，MySQL会拒绝该语句（错误1442）
+        
+        参数:
+            tag_ids: 标签ID列表
         
-        return False
+        返回:
+            bool: 标签是否有变化
+        """
+        tag_ids = set(tag_ids)
+        
+        # 移除不在列表中的标签（使用次数由触发器减少）
+        stmt = db.delete(PromptTag).where(PromptTag.prompt_id == self.id)
+        if tag_ids:
+            stmt = stmt.where(PromptTag.tag_id.not_in(tag_ids))
+        removed = db.session.execute(stmt, execution_options={'synchronize_session': False})
+        
+        # 过滤不存在的标签
+        if tag_ids:
+            tag_ids = db.session.scalars(db.select(Tag.id).where(Tag.id.in_(tag_ids))).all()
+        
+        added = 0
+        if tag_ids:
+            # 一条多行INSERT添加尚未关联的标签（使用次数由触发器增加）
+            added = db.session.execute(
+                db.insert(PromptTag)
+                .values([{'prompt_id': self.id, 'tag_id': tag_id} for tag_id in tag_ids])
+                .prefix_with('IGNORE', dialect='mysql')
+                .prefix_with('OR IGNORE', dialect='sqlite')
+            ).rowcount
+        
+        return bool(removed.rowcount or added)
     
     def soft_delete(self):
-        """软删除"""
+        """软删除（不提交事务）"""
         self.is_deleted = True
-        self.save()
+        self.stage()
     
     def restore(self):
-        """恢复软删除"""
+        """恢复软删除（不提交事务）"""
         self.is_deleted = False
-        self.save()
+        self.stage()
     
     def to_dict(self, include_tags=False, include_author=False):
         """
@@ -328,10 +449,136 @@ class Prompt(BaseModel):
         
         return data
     
+    @classmethod
+    def list_options(cls):
+        """
+        列表查询的加载选项
+        只加载LIST_COLUMNS中的列，内容在数据库中截取为预览
+        
+        返回:
+            tuple: 加载选项
+        """
+        return (
+            load_only(*(getattr(cls, name) for name in cls.LIST_COLUMNS)),
+            # 多取一个字符用于判断是否需要省略号
+            with_expression(cls.content_preview, func.substr(cls.content, 1, PREVIEW_LENGTH + 1)),
+        )
+    
+    def to_list_dict(self):
+        """
+        转换为列表项字典
+        需配合list_options()查询，包含内容预览、标签和作者信息，不包含完整内容
+        
+        返回:
+            dict: Prompt列表项字典
+        """
+        data = {name: getattr(self, name) for name in self.LIST_COLUMNS}
+        
+        preview = self.content_preview or ''
+        if len(preview) > PREVIEW_LENGTH:
+            preview = preview[:PREVIEW_LENGTH] + '...'
+        data['content_preview'] = preview
+        
+        data['tags'] = [tag.to_dict() for tag in self.get_tags()]
+        
+        if self.author:
+            data['author'] = {
+                'id': self.author.id,
+                'username': self.author.username
+            }
+        
+        return data
+    
+    @classmethod
+    def fetch_with_permission(cls, prompt_id, user_id, *options, for_update=False):
+        """
+        获取Prompt及用户对其的有效权限
+        作者判断和协作权限通过一次联表查询完成
+        
+        参数:
+            prompt_id: Prompt ID
+            user_id: 用户ID
+            *options: 附加的加载选项（如selectinload）
+            for_update: 是否锁定Prompt行（SELECT ... FOR UPDATE），
+                        锁持有到事务提交，同一Prompt的并发修改排队执行
+        
+        返回:
+            tuple: (Prompt实例或None, 权限)
+                   权限为 'owner'、'admin'、'write'、'read'，无权限时为None
+        """
+        stmt = cls._with_permission(db.select(cls, cls._permission_expr(user_id)), prompt_id, user_id)
+        
+        if options:
+            stmt = stmt.options(*options)
+        
+        if for_update:
+            # 加锁读取的是最新已提交的数据，覆盖会话中可能已有的旧值
+            stmt = stmt.with_for_update(of=cls).execution_options(populate_existing=True)
+        
+        row = db.session.execute(stmt).first()
+        if row is None:
+            return None, None
+        
+        _permission_cache()[(prompt_id, user_id)] = row[1]
+        return row[0], row[1]
+    
+    @classmethod
+    def get_permission(cls, prompt_id, user_id):
+        """
+        获取用户对Prompt的有效权限，不加载Prompt
+        作者判断和协作权限通过一次查询完成
+        
+        参数:
+            prompt_id: Prompt ID
+            user_id: 用户ID
+        
+        返回:
+            str: 'owner'、'admin'、'write'、'read'，Prompt不存在或无权限时为None
+        """
+        # 同一请求内对同一Prompt的重复检查只查询一次
+        cache = _permission_cache()
+        key = (prompt_id, user_id)
+        if key not in cache:
+            stmt = cls._with_permission(db.select(cls._permission_expr(user_id)), prompt_id, user_id)
+            cache[key] = db.session.scalar(stmt)
+        return cache[key]
+    
+    @classmethod
+    def _permission_expr(cls, user_id):
+        """权限列：作者为owner，否则为协作权限（无协作时为NULL）"""
+        return db.case(
+            (cls.author_id == user_id, 'owner'),
+            else_=Collaboration.permission
+        ).label('permission')
+    
+    @classmethod
+    def _with_permission(cls, stmt, prompt_id, user_id):
+        """为查询联接当前用户的协作记录并限定Prompt"""
+        return stmt.select_from(cls).outerjoin(
+            Collaboration,
+            db.and_(Collaboration.prompt_id == cls.id, Collaboration.user_id == user_id)
+        ).where(cls.id == prompt_id)
+    
+    @staticmethod
+    def permission_allows(permission, required):
+        """
+        判断权限是否满足要求
+        
+        参数:
+            permission: fetch_with_permission返回的权限
+            required: 要求的权限类型 ('read', 'write', 'admin')
+        
+        返回:
+            bool: 是否满足
+        """
+        return permission in PERMISSION_LEVELS.get(required, ())
+    
     @classmethod
     def search(cls, keyword, tags=None, author_id=None):
         """
         搜索Prompt
+        结果的标签随Prompt批量加载（prompt_tags为selectin，关联行与标签一次联表查询），
+        序列化标签时不会逐条查询
         
         参数:
             keyword: 搜索关键词
@@ -345,17 +592,11 @@ class Prompt(BaseModel):
         
         # 关键词搜索
         if keyword:
-            search_filter = db.or_(
-                cls.title.contains(keyword),
-                cls.content.contains(keyword),
-                cls.description.contains(keyword)
-            )
-            query = query.filter(search_filter)
+            query = query.filter(cls._keyword_filter(keyword))
         
-        # 标签筛选
+        # 标签筛选（EXISTS子查询，匹配多个标签时不会产生重复行）
         if tags:
-            from .tag import PromptTag
-            query = query.join(PromptTag).filter(PromptTag.tag_id.in_(tags))
+            query = query.filter(cls.prompt_tags.any(PromptTag.tag_id.in_(tags)))
         
         # 作者筛选
         if author_id:
@@ -363,11 +604,125 @@ class Prompt(BaseModel):
         
         return query
     
+    @classmethod
+    def _keyword_filter(cls, keyword):
+        """
+        关键词匹配条件
+        MySQL上使用全文索引按短语匹配（MATCH ... AGAINST，布尔模式），
+        其他数据库或关键词短于ngram分词长度时使用LIKE
+        
+        参数:
+            keyword: 搜索关键词
+        
+        返回:
+            查询条件
+        """
+        # 去掉布尔模式的短语引号，整个关键词作为一个短语匹配
+        phrase = keyword.replace('"', ' ').strip()
+        
+        if db.engine.dialect.name == 'mysql' and len(phrase) >= NGRAM_TOKEN_SIZE:
+            return match(
+                cls.title, cls.content, cls.description,
+                against=f'"{phrase}"'
+            ).in_boolean_mode()
+        
+        return db.or_(
+            cls.title.contains(keyword),
+            cls.content.contains(keyword),
+            cls.description.contains(keyword)
+        )
+    
     def __repr__(self):
         """返回Prompt的字符串表示"""
         return f"<Prompt {self.title}>"
 
 
+# 用户的Prompt数量（users.prompts_count，不含已删除）由触发器维护：
+# 新增、删除Prompt以及软删除/恢复（is_deleted变化）时在数据库内同步更新，
+# 其他列的更新只判断条件，不写users表
+# 新建数据库由 db.create_all() 创建触发器，已有数据库执行 migrations/009
+PROMPTS_COUNT_TRIGGERS = (
+    """
+    CREATE TRIGGER trg_prompts_after_insert AFTER INSERT ON prompts
+    FOR EACH ROW
+        UPDATE users SET prompts_count = prompts_count + 1
+        WHERE id = NEW.author_id AND NEW.is_deleted = 0
+    """,
+    """
+    CREATE TRIGGER trg_prompts_after_update AFTER UPDATE ON prompts
+    FOR EACH ROW
+        UPDATE users SET prompts_count = prompts_count + (OLD.is_deleted - NEW.is_deleted)
+        WHERE id = NEW.author_id AND OLD.is_deleted <> NEW.is_deleted
+    """,
+    """
+    CREATE TRIGGER trg_prompts_after_delete AFTER DELETE ON prompts
+    FOR EACH ROW
+        UPDATE users SET prompts_count = prompts_count - 1
+        WHERE id = OLD.author_id AND OLD.is_deleted = 0 AND prompts_count > 0
+    """,
+)
+
+for _trigger in PROMPTS_COUNT_TRIGGERS:
+    event.listen(Prompt.__table__, 'after_create', DDL(_trigger).execute_if(dialect='mysql'))
+
+
+def _permission_cache():
+    """
+    获取当前请求的权限缓存: (prompt_id, user_id) -> 权限
+    缓存在flask.g中，请求结束即丢弃；没有应用上下文时返回临时字典，即不缓存
+    """
+    if not has_app_context():
+        return {}
+    if '_permission_cache' not in g:
+        g._permission_cache = {}
+    return g._permission_cache
+
+
+@event.listens_for(Session, 'after_flush')
+def _clear_permission_cache(session, flush_context):
+    """Prompt或协作记录有增删改时清空当前请求的权限缓存"""
+    if not has_app_context() or '_permission_cache' not in g:
+        return
+    
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Prompt, Collaboration)):
+            g._permission_cache.clear()
+            return
+
+
+def _content_diff(old_version, new_version):
+    """
+    计算两个版本内容的unified diff，结果带缓存
+    
+    参数:
+        old_version: 旧版本
+        new_version: 新版本
+    
+    返回:
+        list: diff行列表，内容相同时为空列表
+    """
+    if old_version.content == new_version.content:
+        return []
+    
+    key = (old_version.id, new_version.id)
+    with _diff_cache_lock:
+        diff = _diff_cache.get(key)
+    if diff is not None:
+        return diff
+    
+    diff = cached('version_diff', key, DIFF_CACHE_TTL, lambda: list(difflib.unified_diff(
+        old_version.content.splitlines(),
+        new_version.content.splitlines(),
+        lineterm='',
+        fromfile=f'版本 {old_version.version_number}',
+        tofile=f'版本 {new_version.version_number}'
+    )))
+    
+    with _diff_cache_lock:
+        _diff_cache[key] = diff
+    return diff
+
+
 class PromptVersion(BaseModel):
     """Prompt版本模型"""
     
@@ -395,9 +750,9 @@ class PromptVersion(BaseModel):
         comment='版本标题'
     )
     
-    # 版本内容
+    # 版本内容（各版本内容大量重复，长内容压缩存储）
     content = db.Column(
-        db.Text,
+        CompressedText,
         nullable=False,
         comment='版本内容'
     )
@@ -453,23 +808,12 @@ class PromptVersion(BaseModel):
         返回:
             dict: 差异信息
         """
-        import difflib
-        
-        # 比较内容差异
-        content_diff = list(difflib.unified_diff(
-            other_version.content.splitlines(),
-            self.content.splitlines(),
-            lineterm='',
-            fromfile=f'版本 {other_version.version_number}',
-            tofile=f'版本 {self.version_number}'
-        ))
-        
         return {
             'from_version': other_version.version_number,
             'to_version': self.version_number,
             'title_changed': self.title != other_version.title,
             'description_changed': self.description != other_version.description,
-            'content_diff': content_diff
+            'content_diff': _content_diff(other_version, self)
         }
     
     def __repr__(self):
@@ -3,6 +3,8 @@
 定义标签表和Prompt-标签关联表
 """
 
+from sqlalchemy import DDL, event
+
 from .base import db, BaseModel
 
 
@@ -63,23 +65,24 @@ class Tag(BaseModel):
     )
     
     # 关联的Prompt
+    # PromptTag.tag 随关联行一起联表加载，遍历Prompt的标签时不再逐个查询标签
     prompt_tags = db.relationship(
         'PromptTag',
-        backref='tag',
+        backref=db.backref('tag', lazy='joined'),
         lazy='dynamic',
         cascade='all, delete-orphan'
     )
     
     def increment_use_count(self):
-        """增加使用次数"""
+        """增加使用次数（不提交事务）"""
         self.use_count += 1
-        self.save()
+        self.stage()
     
     def decrement_use_count(self):
-        """减少使用次数"""
+        """减少使用次数（不提交事务）"""
         if self.use_count > 0:
             self.use_count -= 1
-            self.save()
+            self.stage()
     
     def get_prompts(self):
         """
@@ -88,7 +91,8 @@ class Tag(BaseModel):
         返回:
             Prompt列表
         """
-        return [pt.prompt for pt in self.prompt_tags]
+        # 关联行和Prompt一次联表查询得到
+        return [pt.prompt for pt in self.prompt_tags.options(db.joinedload(PromptTag.prompt))]
     
     def get_prompts_count(self):
         """
@@ -97,7 +101,10 @@ class Tag(BaseModel):
         返回:
             int: Prompt数量
         """
-        return self.prompt_tags.count()
+        # 直接COUNT，不经过动态关系生成的子查询
+        return db.session.scalar(
+            db.select(db.func.count()).select_from(PromptTag).where(PromptTag.tag_id == self.id)
+        )
     
     @classmethod
     def get_by_name(cls, name):
@@ -191,11 +198,35 @@ class PromptTag(BaseModel):
         comment='标签ID'
     )
     
-    # 唯一约束
     __table_args__ = (
+        # 唯一约束
         db.UniqueConstraint('prompt_id', 'tag_id', name='uk_prompt_tag'),
+        # 按标签筛选Prompt时只需扫描索引
+        db.Index('idx_prompt_tags_tag_prompt', 'tag_id', 'prompt_id'),
     )
     
     def __repr__(self):
         """返回关联的字符串表示"""
-        return f"<PromptTag prompt:{self.prompt_id} tag:{self.tag_id}>"
\ No newline at end of file
+        return f"<PromptTag prompt:{self.prompt_id} tag:{self.tag_id}>"
+
+# 标签使用次数由触发器维护：关联行插入/删除时在数据库内同步更新 tags.use_count，
+# 应用只写关联表，不再单独UPDATE计数；绕过应用写入的关联行也会计入
+# INSERT IGNORE 被忽略的行不触发 AFTER INSERT，外键级联删除不触发 AFTER DELETE
+# 新建数据库由 db.create_all() 创建触发器，已有数据库执行 migrations/007
+# 注意: 写 prompt_tags 的语句不能同时读取 tags（如 INSERT ... SELECT FROM tags），
+# 触发器要更新 tags，MySQL会拒绝该语句（错误1442）；需要校验标签时先单独查询
+USE_COUNT_TRIGGERS = (
+    """
+    CREATE TRIGGER trg_prompt_tags_after_insert AFTER INSERT ON prompt_tags
+    FOR EACH ROW
+        UPDATE tags SET use_count = use_count + 1 WHERE id = NEW.tag_id
+    """,
+    """
+    CREATE TRIGGER trg_prompt_tags_after_delete AFTER DELETE ON prompt_tags
+    FOR EACH ROW
+        UPDATE tags SET use_count = use_count - 1 WHERE id = OLD.tag_id AND use_count > 0
+    """,
+)
+
+for _trigger in USE_COUNT_TRIGGERS:
+    event.listen(PromptTag.__table__, 'after_create', DDL(_trigger).execute_if(dialect='mysql'))
@@ -3,6 +3,7 @@
 定义Prompt测试记录表结构
 """
 
+from app.utils.pagination import seek_before
 from .base import db, BaseModel
 
 
@@ -98,6 +99,12 @@ class TestRecord(BaseModel):
         comment='错误信息'
     )
     
+    # 索引
+    __table_args__ = (
+        # 按模型统计测试结果时只需读取索引，不回表
+        db.Index('idx_test_records_prompt_model', 'prompt_id', 'model_name', 'status', 'response_time'),
+    )
+    
     # 关系定义
     tester = db.relationship(
         'User',
@@ -136,18 +143,19 @@ class TestRecord(BaseModel):
         return round(input_cost + output_cost, 4)
     
     @classmethod
-    def get_user_tests(cls, user_id, limit=None):
+    def get_user_tests(cls, user_id, limit=None, before=None):
         """
         获取用户的测试记录
         
         参数:
             user_id: 用户ID
             limit: 返回数量限制
+            before: 上一页最后一条记录的 (created_at, id)，用于翻页
         
         返回:
             TestRecord列表
         """
-        query = cls.query.filter_by(user_id=user_id).order_by(cls.created_at.desc())
+        query = seek_before(cls.query.filter_by(user_id=user_id), cls.created_at, cls.id, before)
         
         if limit:
             query = query.limit(limit)
@@ -155,18 +163,19 @@ class TestRecord(BaseModel):
         return query.all()
     
     @classmethod
-    def get_prompt_tests(cls, prompt_id, limit=None):
+    def get_prompt_tests(cls, prompt_id, limit=None, before=None):
         """
         获取Prompt的测试记录
         
         参数:
             prompt_id: Prompt ID
             limit: 返回数量限制
+            before: 上一页最后一条记录的 (created_at, id)，用于翻页
         
         返回:
             TestRecord列表
         """
-        query = cls.query.filter_by(prompt_id=prompt_id).order_by(cls.created_at.desc())
+        query = seek_before(cls.query.filter_by(prompt_id=prompt_id), cls.created_at, cls.id, before)
         
         if limit:
             query = query.limit(limit)
@@ -184,38 +193,28 @@ class TestRecord(BaseModel):
         返回:
             dict: 模型统计信息
         """
-        tests = cls.query.filter_by(prompt_id=prompt_id).all()
+        # 在数据库中按模型分组聚合，不加载测试记录
+        rows = db.session.execute(
+            db.select(
+                cls.model_name,
+                db.func.count(),
+                db.func.sum(db.case((cls.status == 'success', 1), else_=0)),
+                db.func.sum(db.case((cls.status == 'failed', 1), else_=0)),
+                db.func.sum(cls.response_time)
+            )
+            .where(cls.prompt_id == prompt_id)
+            .group_by(cls.model_name)
+        ).all()
         
         stats = {}
-        for test in tests:
-            model = test.model_name
-            if model not in stats:
-                stats[model] = {
-                    'total_tests': 0,
-                    'success_count': 0,
-                    'failed_count': 0,
-                    'avg_response_time': 0,
-                    'total_response_time': 0
-                }
-            
-            stats[model]['total_tests'] += 1
-            
-            if test.status == 'success':
-                stats[model]['success_count'] += 1
-            elif test.status == 'failed':
-                stats[model]['failed_count'] += 1
-            
-            if test.response_time:
-                stats[model]['total_response_time'] += float(test.response_time)
-        
-        # 计算平均响应时间
-        for model in stats:
-            if stats[model]['total_tests'] > 0:
-                stats[model]['avg_response_time'] = round(
-                    stats[model]['total_response_time'] / stats[model]['total_tests'],
-                    3
-                )
-            del stats[model]['total_response_time']  # 删除临时字段
+        for model, total, success_count, failed_count, total_response_time in rows:
+            stats[model] = {
+                'total_tests': total,
+                'success_count': int(success_count or 0),
+                'failed_count': int(failed_count or 0),
+                # 平均响应时间按全部测试次数计算，未记录响应时间的测试按0计
+                'avg_response_time': round(float(total_response_time or 0) / total, 3)
+            }
         
         return stats
     
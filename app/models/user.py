@@ -3,8 +3,15 @@
 定义用户表结构和相关方法
 """
 
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime
+
+from sqlalchemy.ext.mutable import MutableDict
+
+from app.utils.security import hash_password, verify_password, verify_dummy_password, needs_rehash
 from .base import db, BaseModel
+from .prompt import Prompt
+from .collaboration import Collaboration
+from .user_setting import UserSetting
 
 
 class User(BaseModel):
@@ -42,9 +49,9 @@ class User(BaseModel):
         comment='头像URL'
     )
     
-    # 主题偏好设置，JSON格式存储
+    # 主题偏好设置，JSON格式存储（MutableDict跟踪原地修改）
     theme_preference = db.Column(
-        db.JSON,
+        MutableDict.as_mutable(db.JSON),
         default=None,
         comment='主题偏好设置'
     )
@@ -63,12 +70,20 @@ class User(BaseModel):
         comment='最后登录时间'
     )
     
+    # 创建的Prompt数量（不含已删除），由prompts表的触发器维护
+    prompts_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        comment='Prompt数量'
+    )
+    
     # 关系定义
-    # 用户创建的Prompt列表
+    # 用户创建的Prompt列表（访问时才加载，需要时在查询中使用selectinload批量预加载）
     prompts = db.relationship(
         'Prompt',
-        backref='author',
-        lazy='dynamic',
+        back_populates='author',
         foreign_keys='Prompt.author_id'
     )
     
@@ -80,19 +95,18 @@ class User(BaseModel):
         cascade='all, delete-orphan'
     )
     
-    # 用户的协作权限
+    # 用户的协作权限（访问时才加载，需要时在查询中使用selectinload批量预加载）
     collaborations = db.relationship(
         'Collaboration',
-        backref='user',
-        lazy='dynamic',
+        back_populates='user',
         foreign_keys='Collaboration.user_id'
     )
     
-    # 用户的操作日志
+    # 用户的操作日志（数量不受限，只用于写入，查询使用OperationLog的分页方法）
     operation_logs = db.relationship(
         'OperationLog',
-        backref='user',
-        lazy='dynamic'
+        back_populates='user',
+        lazy='write_only'
     )
     
     def set_password(self, password):
@@ -102,11 +116,12 @@ class User(BaseModel):
         参数:
             password: 明文密码
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """
         验证密码
+        验证通过且哈希算法或成本已过时时，用当前配置重新哈希（不提交事务，随登录一起提交）
         
         参数:
             password: 明文密码
@@ -114,22 +129,29 @@ class User(BaseModel):
         返回:
             bool: 密码是否正确
         """
-        return check_password_hash(self.password_hash, password)
+        if not verify_password(self.password_hash, password):
+            return False
+        
+        if needs_rehash(self.password_hash):
+            self.set_password(password)
+            self.stage()
+        
+        return True
     
     def update_login_time(self):
-        """更新最后登录时间"""
-        from datetime import datetime
+        """更新最后登录时间（不提交事务）"""
         self.last_login_at = datetime.utcnow()
-        self.save()
+        self.stage()
     
     def get_prompts_count(self):
         """
-        获取用户创建的Prompt数量
+        获取用户创建的Prompt数量（不含已删除）
         
         返回:
             int: Prompt数量
         """
-        return self.prompts.count()
+        # 计数列由触发器维护，随用户一起加载，不需要COUNT查询
+        return self.prompts_count
     
     def get_collaboration_prompts(self):
         """
@@ -138,7 +160,12 @@ class User(BaseModel):
         返回:
             Prompt列表
         """
-        return [collab.prompt for collab in self.collaborations]
+        # 协作记录和Prompt一次联表查询得到
+        return db.session.scalars(
+            db.select(Prompt)
+            .join(Collaboration, Collaboration.prompt_id == Prompt.id)
+            .where(Collaboration.user_id == self.id)
+        ).all()
     
     def has_permission(self, prompt_id, permission='read'):
         """
@@ -151,31 +178,8 @@ class User(BaseModel):
         返回:
             bool: 是否有权限
         """
-        from .prompt import Prompt
-        from .collaboration import Collaboration
-        
-        # 检查是否是作者
-        prompt = Prompt.get_by_id(prompt_id)
-        if prompt and prompt.author_id == self.id:
-            return True
-        
-        # 检查协作权限
-        collab = Collaboration.query.filter_by(
-            prompt_id=prompt_id,
-            user_id=self.id
-        ).first()
-        
-        if not collab:
-            return False
-        
-        # 权限等级检查
-        permission_levels = {
-            'read': ['read', 'write', 'admin'],
-            'write': ['write', 'admin'],
-            'admin': ['admin']
-        }
-        
-        return collab.permission in permission_levels.get(permission, [])
+        # 作者和协作权限一次查询得到
+        return Prompt.permission_allows(Prompt.get_permission(prompt_id, self.id), permission)
     
     def to_dict(self, exclude=None):
         """
@@ -208,6 +212,25 @@ class User(BaseModel):
         """
         return cls.query.filter_by(email=email).first()
     
+    @classmethod
+    def verify_credentials(cls, email, password):
+        """
+        按邮箱和密码验证用户
+        用户不存在时也执行一次相同成本的密码验证，响应时间不会泄露邮箱是否已注册
+        
+        参数:
+            email: 用户邮箱
+            password: 明文密码
+        
+        返回:
+            User实例，邮箱不存在或密码错误时返回None
+        """
+        user = cls.get_by_email(email)
+        if user is None:
+            return verify_dummy_password(password) or None
+        
+        return user if user.check_password(password) else None
+    
     @classmethod
     def get_by_username(cls, username):
         """
@@ -221,6 +244,22 @@ class User(BaseModel):
         """
         return cls.query.filter_by(username=username).first()
     
+    @classmethod
+    def get_by_username_or_email(cls, username, email):
+        """
+        一次查询获取用户名或邮箱匹配的用户
+        
+        参数:
+            username: 用户名
+            email: 邮箱
+        
+        返回:
+            User列表（最多2个）
+        """
+        return cls.query.filter(
+            db.or_(cls.username == username, cls.email == email)
+        ).limit(2).all()
+    
     @classmethod
     def create_user(cls, username, email, password, **kwargs):
         """
@@ -241,11 +280,10 @@ class User(BaseModel):
             **kwargs
         )
         user.set_password(password)
-        user.save()
         
-        # 创建默认用户设置
-        from .user_setting import UserSetting
-        UserSetting.create(user_id=user.id)
+        # 默认用户设置随用户一起插入，一次提交；设置的user_id在flush时由关系填充
+        user.settings = UserSetting()
+        user.save()
         
         return user
     
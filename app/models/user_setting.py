@@ -3,9 +3,18 @@
 定义用户设置表结构
 """
 
+from sqlalchemy.ext.mutable import MutableDict
+
 from .base import db, BaseModel
 
 
+# 可选的编辑器主题
+VALID_THEMES = frozenset(['light', 'dark', 'sepia'])
+
+# 可选的背景音乐（None表示关闭）
+VALID_BACKGROUND_MUSIC = frozenset(['rain', 'forest', 'piano', None])
+
+
 class UserSetting(BaseModel):
     """用户设置模型"""
     
@@ -62,9 +71,9 @@ class UserSetting(BaseModel):
         comment='是否开启通知'
     )
     
-    # 快捷键配置（JSON格式）
+    # 快捷键配置（JSON格式，MutableDict跟踪原地修改）
     keyboard_shortcuts = db.Column(
-        db.JSON,
+        MutableDict.as_mutable(db.JSON),
         default=None,
         comment='快捷键配置'
     )
@@ -110,6 +119,51 @@ class UserSetting(BaseModel):
         settings.save()
         return settings
     
+    @staticmethod
+    def is_valid_theme(theme):
+        """
+        判断编辑器主题是否可用
+        先检查类型：列表、字典等不可哈希的JSON值不能直接做集合成员判断
+        
+        参数:
+            theme: 主题名称
+        
+        返回:
+            bool: 是否可用
+        """
+        return isinstance(theme, str) and theme in VALID_THEMES
+    
+    @staticmethod
+    def is_valid_background_music(music):
+        """
+        判断背景音乐是否可用（None表示关闭）
+        
+        参数:
+            music: 音乐名称
+        
+        返回:
+            bool: 是否可用
+        """
+        return (music is None or isinstance(music, str)) and music in VALID_BACKGROUND_MUSIC
+    
+    @staticmethod
+    def is_valid_shortcuts(shortcuts):
+        """
+        判断快捷键配置的格式: 操作名称 -> 快捷键 的字典，或None
+        列类型为MutableDict，赋值其他类型的JSON值会抛出ValueError
+        
+        参数:
+            shortcuts: 快捷键配置
+        
+        返回:
+            bool: 格式是否正确
+        """
+        if shortcuts is None:
+            return True
+        return isinstance(shortcuts, dict) and all(
+            isinstance(shortcut, str) for shortcut in shortcuts.values()
+        )
+    
     def update_theme(self, theme):
         """
         更新编辑器主题
@@ -120,12 +174,13 @@ class UserSetting(BaseModel):
         返回:
             bool: 是否成功
         """
-        valid_themes = ['light', 'dark', 'sepia']
-        if theme not in valid_themes:
+        if not self.is_valid_theme(theme):
             return False
         
-        self.editor_theme = theme
-        self.save()
+        # 主题未变化时不写库
+        if self.editor_theme != theme:
+            self.editor_theme = theme
+            self.save()
         return True
     
     def update_background_music(self, music):
@@ -138,12 +193,13 @@ class UserSetting(BaseModel):
         返回:
             bool: 是否成功
         """
-        valid_music = ['rain', 'forest', 'piano', None]
-        if music not in valid_music:
+        if not self.is_valid_background_music(music):
             return False
         
-        self.background_music = music
-        self.save()
+        # 背景音乐未变化时不写库
+        if self.background_music != music:
+            self.background_music = music
+            self.save()
         return True
     
     def get_shortcut(self, action):
@@ -174,6 +230,7 @@ class UserSetting(BaseModel):
         if not self.keyboard_shortcuts:
             self.keyboard_shortcuts = {}
         
+        # 原地修改由MutableDict标记为已变更，提交时只UPDATE该列
         self.keyboard_shortcuts[action] = shortcut
         self.save()
         return True
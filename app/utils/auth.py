@@ -0,0 +1,102 @@
+"""
+认证工具模块
+提供获取当前登录用户等认证相关的辅助函数
+"""
+
+import hashlib
+import threading
+import time
+
+from cachetools import TTLCache
+from flask import g, request, current_app
+from flask_jwt_extended import JWTManager, get_jwt_identity
+
+from app.models.user import User
+
+
+class CachedJWTManager(JWTManager):
+    """
+    带解码缓存的JWTManager
+    同一token重复请求时直接复用已校验的claims，跳过签名校验和JSON解析
+    """
+    
+    def init_app(self, app, add_context_processor=False):
+        super().init_app(app, add_context_processor)
+        self._decode_cache = TTLCache(
+            maxsize=app.config.get('JWT_DECODE_CACHE_SIZE', 10000),
+            ttl=app.config.get('JWT_DECODE_CACHE_TTL', 60)
+        )
+        # TTLCache非线程安全，gthread worker下需要加锁
+        self._decode_cache_lock = threading.Lock()
+    
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # 需要校验CSRF或允许过期token时不走缓存
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        
+        key = _token_cache_key(encoded_token)
+        with self._decode_cache_lock:
+            claims = self._decode_cache.get(key)
+        
+        # 缓存命中仍需检查过期时间，缓存TTL不会超过token剩余有效期
+        if claims is not None and claims.get('exp', float('inf')) > time.time():
+            return claims
+        
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        with self._decode_cache_lock:
+            self._decode_cache[key] = claims
+        return claims
+    
+    def forget_token(self, encoded_token):
+        """
+        从解码缓存中移除token
+        
+        参数:
+            encoded_token: 原始JWT字符串
+        """
+        with self._decode_cache_lock:
+            self._decode_cache.pop(_token_cache_key(encoded_token), None)
+
+
+def _token_cache_key(encoded_token):
+    """计算token的缓存键，blake2b比HMAC校验加JSON解析快得多"""
+    return hashlib.blake2b(encoded_token.encode('utf-8'), digest_size=16).digest()
+
+
+def forget_current_token():
+    """
+    将当前请求携带的token移出解码缓存
+    需要在 @jwt_required() 保护的接口中调用
+    """
+    jwt_manager = current_app.extensions.get('flask-jwt-extended')
+    if not isinstance(jwt_manager, CachedJWTManager):
+        return
+    
+    auth_header = request.headers.get(current_app.config['JWT_HEADER_NAME'], '')
+    encoded_token = auth_header.split(' ')[-1]
+    if encoded_token:
+        jwt_manager.forget_token(encoded_token)
+
+
+def get_current_user_id():
+    """
+    获取当前登录用户ID
+    需要在 @jwt_required() 保护的接口中调用
+    
+    返回:
+        int: 用户ID
+    """
+    return int(get_jwt_identity())
+
+
+def load_current_user():
+    """
+    获取当前登录用户
+    结果缓存在flask.g中，同一请求内多次调用只查询一次数据库
+    
+    返回:
+        User实例或None
+    """
+    if 'current_user' not in g:
+        g.current_user = User.get_by_id(get_current_user_id())
+    return g.current_user
@@ -0,0 +1,228 @@
+"""
+缓存工具模块
+基于Redis的旁路缓存（cache-aside），未开启Redis或Redis不可用时直接回源查询
+"""
+
+import time
+
+import orjson
+import redis
+
+from app.utils.logger import get_logger
+
+# 缓存键前缀，缓存数据格式变化时修改
+CACHE_KEY_PREFIX = 'v1'
+
+# 回源锁的过期时间（秒）
+LOCK_TIMEOUT = 10
+
+# 未拿到回源锁时等待其他请求写入缓存的重试次数和间隔（秒）
+LOCK_WAIT_RETRIES = 5
+LOCK_WAIT_INTERVAL = 0.05
+
+# Redis客户端，未开启Redis时为None
+redis_client = None
+
+
+def init_cache(app):
+    """
+    初始化Redis客户端
+    
+    参数:
+        app: Flask应用实例
+    """
+    global redis_client
+    
+    if not app.config.get('REDIS_ENABLED'):
+        return
+    
+    # 超时设置较短，Redis异常时尽快回源，不拖慢请求
+    pool = redis.ConnectionPool(
+        host=app.config['REDIS_HOST'],
+        port=app.config['REDIS_PORT'],
+        db=app.config['REDIS_DB'],
+        password=app.config['REDIS_PASSWORD'] or None,
+        socket_timeout=app.config['REDIS_SOCKET_TIMEOUT'],
+        socket_connect_timeout=app.config['REDIS_SOCKET_TIMEOUT']
+    )
+    redis_client = redis.Redis(connection_pool=pool)
+    app.extensions['redis'] = redis_client
+    get_logger('app').info(f"Redis缓存已启用: {app.config['REDIS_HOST']}:{app.config['REDIS_PORT']}")
+
+
+def reset_cache():
+    """
+    丢弃从父进程继承的Redis连接（fork后在子进程中调用）
+    不关闭连接：连接仍属于父进程，子进程按需建立自己的连接
+    """
+    if redis_client is not None:
+        redis_client.connection_pool.reset()
+
+
+def _namespace_version(namespace):
+    """获取命名空间当前的版本号"""
+    version = redis_client.get(f'{CACHE_KEY_PREFIX}:{namespace}:version')
+    return int(version) if version else 0
+
+
+def cache_key(namespace, *parts):
+    """
+    构造带版本号的缓存键
+    命名空间的版本号递增后，旧版本的键不再被读取，等待过期即可
+    
+    参数:
+        namespace: 命名空间，如 'tags'
+        *parts: 键的其余部分
+    
+    返回:
+        str: 缓存键，如 'v1:tags:3:all'
+    """
+    version = _namespace_version(namespace)
+    return ':'.join([CACHE_KEY_PREFIX, namespace, str(version), *map(str, parts)])
+
+
+def cache_get_json(key):
+    """
+    读取缓存
+    
+    参数:
+        key: 缓存键
+    
+    返回:
+        缓存的数据，不存在时返回None
+    """
+    value = redis_client.get(key)
+    return orjson.loads(value) if value is not None else None
+
+
+def cache_set_json(key, value, ttl):
+    """
+    写入缓存
+    
+    参数:
+        key: 缓存键
+        value: 可JSON序列化的数据
+        ttl: 过期时间（秒）
+    """
+    redis_client.set(key, orjson.dumps(value), ex=ttl)
+
+
+def cached(namespace, parts, ttl, loader):
+    """
+    旁路缓存读取
+    缓存未命中时只允许一个请求回源（SET NX锁），其余请求短暂等待后重读缓存，避免缓存击穿
+    
+    参数:
+        namespace: 命名空间
+        parts: 缓存键的其余部分（元组）
+        ttl: 过期时间（秒）
+        loader: 回源函数，返回可JSON序列化的数据
+    
+    返回:
+        缓存或回源得到的数据
+    """
+    if redis_client is None:
+        return loader()
+    
+    try:
+        key = cache_key(namespace, *parts)
+        value = cache_get_json(key)
+        if value is not None:
+            return value
+        
+        lock_key = f'{key}:lock'
+        owns_lock = bool(redis_client.set(lock_key, '1', nx=True, ex=LOCK_TIMEOUT))
+        if not owns_lock:
+            for _ in range(LOCK_WAIT_RETRIES):
+                time.sleep(LOCK_WAIT_INTERVAL)
+                value = cache_get_json(key)
+                if value is not None:
+                    return value
+    except redis.RedisError as e:
+        get_logger('app').warning(f"读取缓存失败，直接查询数据库: {str(e)}")
+        return loader()
+    
+    value = loader()
+    
+    try:
+        cache_set_json(key, value, ttl)
+        if owns_lock:
+            redis_client.delete(lock_key)
+    except redis.RedisError as e:
+        get_logger('app').warning(f"写入缓存失败: {str(e)}")
+    
+    return value
+
+
+def invalidate_namespace(namespace):
+    """
+    使命名空间下的所有缓存失效（递增版本号）
+    
+    参数:
+        namespace: 命名空间
+    """
+    if redis_client is None:
+        return
+    
+    try:
+        redis_client.incr(f'{CACHE_KEY_PREFIX}:{namespace}:version')
+    except redis.RedisError as e:
+        get_logger('app').warning(f"清除缓存失败: {str(e)}")
+
+
+def invalidate_key(namespace, *parts):
+    """
+    使单个缓存键失效（删除当前版本下的键），用于按用户等粒度缓存的数据
+    
+    参数:
+        namespace: 命名空间
+        *parts: 缓存键的其余部分，与cached的parts一致
+    """
+    if redis_client is None:
+        return
+    
+    try:
+        redis_client.delete(cache_key(namespace, *parts))
+    except redis.RedisError as e:
+        get_logger('app').warning(f"清除缓存失败: {str(e)}")
+
+
+def swap_marker(key, value, ttl):
+    """
+    写入标记值并返回旧值（SET ... GET，一次往返），用于识别短时间内的重复请求
+    未开启Redis或Redis不可用时返回None，即不做去重
+    
+    参数:
+        key: 键名
+        value: 新的标记值
+        ttl: 过期时间（秒）
+    
+    返回:
+        str: 旧的标记值，不存在时为None
+    """
+    if redis_client is None:
+        return None
+    
+    try:
+        old = redis_client.set(f'{CACHE_KEY_PREFIX}:{key}', value, ex=ttl, get=True)
+    except redis.RedisError as e:
+        get_logger('app').warning(f"写入缓存失败: {str(e)}")
+        return None
+    
+    return old.decode('utf-8') if old is not None else None
+
+
+def delete_marker(key):
+    """
+    删除标记值
+    
+    参数:
+        key: 键名
+    """
+    if redis_client is None:
+        return
+    
+    try:
+        redis_client.delete(f'{CACHE_KEY_PREFIX}:{key}')
+    except redis.RedisError as e:
+        get_logger('app').warning(f"清除缓存失败: {str(e)}")
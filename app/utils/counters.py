@@ -0,0 +1,174 @@
+"""
+计数器缓冲模块
+查看次数等高频计数先在Redis中累加，由后台线程定期合并为批量UPDATE写入数据库，
+避免热门Prompt的行在每次读取时都被加锁更新。未启用Redis时由调用方直接更新数据库
+"""
+
+import os
+import threading
+import time
+
+import redis
+from sqlalchemy import update, bindparam
+
+from app.models.base import db
+from app.models.prompt import Prompt
+from app.utils import cache
+from app.utils.logger import get_logger
+
+# 可缓冲的计数器: 名称 -> prompts表的列
+COUNTER_COLUMNS = {
+    'view': 'view_count',
+}
+
+# 每批合并写库的数量
+FLUSH_BATCH_SIZE = 500
+
+# 后台合并线程，按进程启动（gunicorn fork出的worker不会继承父进程的线程）
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def _counter_key(name, prompt_id):
+    """计数器在Redis中的键"""
+    return f'{cache.CACHE_KEY_PREFIX}:counter:{name}:{prompt_id}'
+
+
+def incr_pending(name, prompt_id, app):
+    """
+    在Redis中累加计数
+    
+    参数:
+        name: 计数器名称，见 COUNTER_COLUMNS
+        prompt_id: Prompt ID
+        app: Flask应用实例，后台合并线程使用
+    
+    返回:
+        int: 尚未写入数据库的累计值，未启用Redis或Redis不可用时返回None
+    """
+    if cache.redis_client is None:
+        return None
+    
+    try:
+        pending = cache.redis_client.incr(_counter_key(name, prompt_id))
+    except redis.RedisError as e:
+        get_logger('app').warning(f"计数器累加失败，直接写库: {str(e)}")
+        return None
+    
+    _ensure_flusher(app)
+    return pending
+
+
+def flush_counters():
+    """
+    将Redis中累加的计数合并写入数据库
+    在MULTI事务中GET后DEL，原子地取出并清零，多个进程同时合并也不会重复计数
+    （不使用GETDEL，兼容Redis 6.2以前的版本）；写库失败时把取出的计数加回Redis，下次合并时重试
+    
+    返回:
+        int: 写入的Prompt数量
+    """
+    if cache.redis_client is None:
+        return 0
+    
+    table = Prompt.__table__
+    flushed = 0
+    
+    for name, column in COUNTER_COLUMNS.items():
+        keys = list(cache.redis_client.scan_iter(match=_counter_key(name, '*'), count=FLUSH_BATCH_SIZE))
+        
+        for start in range(0, len(keys), FLUSH_BATCH_SIZE):
+            batch = keys[start:start + FLUSH_BATCH_SIZE]
+            
+            pipe = cache.redis_client.pipeline(transaction=True)
+            for key in batch:
+                pipe.get(key)
+                pipe.delete(key)
+            # 结果为 GET、DEL 交替，取GET的结果
+            deltas = pipe.execute()[::2]
+            
+            params = [
+                {'pid': int(key.rsplit(b':', 1)[1]), 'delta': int(delta)}
+                for key, delta in zip(batch, deltas)
+                if delta and int(delta) > 0
+            ]
+            if not params:
+                continue
+            
+            # 计数不属于内容修改，保持updated_at不变
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam('pid'))
+                .values({column: table.c[column] + bindparam('delta'), 'updated_at': table.c.updated_at})
+            )
+            try:
+                db.session.execute(stmt, params)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                _restore_pending(name, params)
+                raise
+            flushed += len(params)
+    
+    return flushed
+
+
+def _restore_pending(name, params):
+    """
+    写库失败后把已从Redis取出的计数加回去，避免丢失
+    
+    参数:
+        name: 计数器名称
+        params: 取出的计数，[{'pid': Prompt ID, 'delta': 计数}, ...]
+    """
+    try:
+        pipe = cache.redis_client.pipeline(transaction=False)
+        for param in params:
+            pipe.incrby(_counter_key(name, param['pid']), param['delta'])
+        pipe.execute()
+    except redis.RedisError as e:
+        get_logger('app').error(f"计数写库失败后加回Redis也失败，丢失 {len(params)} 个Prompt的计数: {str(e)}")
+
+
+def start_flusher(app):
+    """
+    启动当前进程的后台合并线程（fork后在子进程中调用），未启用Redis时不启动
+    
+    参数:
+        app: Flask应用实例
+    """
+    if cache.redis_client is not None:
+        _ensure_flusher(app)
+
+
+def _ensure_flusher(app):
+    """确保当前进程的后台合并线程已启动"""
+    global _flusher_pid
+    
+    if _flusher_pid == os.getpid():
+        return
+    
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+        
+        thread = threading.Thread(
+            target=_flush_loop,
+            args=(app, app.config['COUNTER_FLUSH_INTERVAL']),
+            name='counter-flusher',
+            daemon=True
+        )
+        thread.start()
+
+
+def _flush_loop(app, interval):
+    """定期合并计数"""
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                flush_counters()
+            except Exception as e:
+                db.session.rollback()
+                get_logger('app').error(f"合并计数失败: {str(e)}")
@@ -0,0 +1,47 @@
+"""
+JSON序列化模块
+使用orjson替换Flask默认的标准库json，加快所有接口响应的序列化
+"""
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    基于orjson的JSON提供者
+    jsonify、app.json.dumps和request.get_json都会经过此类
+    """
+    
+    def dumps(self, obj, **kwargs):
+        """
+        序列化为JSON字符串
+        
+        参数:
+            obj: 要序列化的对象
+            **kwargs: 兼容标准库json的参数，只识别indent
+        
+        返回:
+            str: JSON字符串
+        """
+        # 与标准库json一致，允许非字符串的键（如以ID为键的字典）
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        
+        # orjson不支持的类型（如Decimal）交给Flask默认的转换函数处理
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        """
+        反序列化JSON
+        
+        参数:
+            s: JSON字符串或字节串
+        
+        返回:
+            反序列化后的对象
+        """
+        return orjson.loads(s)
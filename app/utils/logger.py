@@ -5,14 +5,53 @@
 
 import os
 import sys
+import copy
+import queue
+import threading
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
+from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler, QueueHandler, QueueListener
 from datetime import datetime
 from pathlib import Path
 
+from config.config import get_config
+
+
+# 创建logger和重新初始化日志管理器时加锁，多个线程同时首次获取同一logger时只配置一次
+_lock = threading.Lock()
+
+# 入队时格式化异常堆栈
+_exception_formatter = logging.Formatter()
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    进程内队列日志处理器
+    入队时在请求线程中生成消息文本和异常堆栈文本，后台线程只负责按格式输出和写文件；
+    不保留args和exc_info的引用，入队后参数对象被修改或异常帧被释放都不影响日志内容
+    """
+    
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        
+        if record.exc_info:
+            # exc_text 由后台线程的Formatter直接追加到消息之后
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        
+        return record
+
 
 class LoggerManager:
-    """日志管理器"""
+    """
+    日志管理器
+    控制台和错误日志的handler全进程共享一份，写同一文件的logger共享同一个队列和文件handler，
+    每个日志文件只有一个后台写日志线程负责写入和按日期切分
+    """
     
     def __init__(self, config):
         """
@@ -23,6 +62,15 @@ class LoggerManager:
         """
         self.config = config
         self.loggers = {}
+        # 各logger的日志文件名，重新初始化时按原文件重新配置
+        self._log_files = {}
+        # 各日志文件的后台写日志线程: 文件路径 -> (QueueHandler, 实际handler列表, QueueListener)
+        self._listeners = {}
+        self._formatter = logging.Formatter(
+            '[%(asctime)s] [%(levelname)s] [%(name)s] [%(filename)s:%(lineno)d] - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+        self._shared_handlers = None
         self._setup_log_directory()
     
     def _setup_log_directory(self):
@@ -31,6 +79,55 @@ class LoggerManager:
         if not log_dir.exists():
             log_dir.mkdir(parents=True, exist_ok=True)
     
+    def _rotating_file_handler(self, file_path):
+        """创建按日期切分的文件handler"""
+        handler = TimedRotatingFileHandler(
+            filename=file_path,
+            when='midnight',  # 每天午夜切分
+            interval=1,  # 间隔1天
+            backupCount=30,  # 保留30天的日志
+            encoding='utf-8'
+        )
+        handler.suffix = "%Y-%m-%d.log"  # 文件后缀格式
+        handler.setFormatter(self._formatter)
+        return handler
+    
+    def _get_shared_handlers(self):
+        """控制台和错误日志handler，所有日志文件共用"""
+        if self._shared_handlers is None:
+            # 控制台输出
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(self._formatter)
+            
+            # 错误日志单独记录
+            error_handler = self._rotating_file_handler(os.path.join(self.config.LOG_DIR, 'error_log'))
+            error_handler.setLevel(logging.ERROR)
+            
+            self._shared_handlers = [console_handler, error_handler]
+        return self._shared_handlers
+    
+    def _get_queue_handler(self, file_path):
+        """
+        获取写入指定日志文件的队列handler，同一文件只创建一个队列和后台线程
+        
+        参数:
+            file_path: 日志文件路径
+        
+        返回:
+            QueueHandler对象
+        """
+        if file_path not in self._listeners:
+            # 实际输出的handler，由后台线程调用，请求线程只负责入队
+            handlers = [*self._get_shared_handlers(), self._rotating_file_handler(file_path)]
+            
+            log_queue = queue.SimpleQueue()
+            queue_handler = _InProcessQueueHandler(log_queue)
+            listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            self._listeners[file_path] = (queue_handler, handlers, listener)
+        
+        return self._listeners[file_path][0]
+    
     def get_logger(self, name='app', log_file=None):
         """
         获取日志记录器
@@ -42,71 +139,60 @@ class LoggerManager:
         返回:
             Logger对象
         """
-        if name in self.loggers:
-            return self.loggers[name]
-        
-        logger = logging.getLogger(name)
-        logger.setLevel(getattr(logging, self.config.LOG_LEVEL.upper()))
-        
-        # 防止重复添加handler
-        if logger.handlers:
+        logger = self.loggers.get(name)
+        if logger is not None:
             return logger
         
-        # 日志格式
-        formatter = logging.Formatter(
-            '[%(asctime)s] [%(levelname)s] [%(name)s] [%(filename)s:%(lineno)d] - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        # 控制台输出
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-        
-        # 文件输出 - 按日期切分
-        if log_file:
-            file_path = os.path.join(self.config.LOG_DIR, log_file)
-        else:
+        with _lock:
+            if name in self.loggers:
+                return self.loggers[name]
+            
+            logger = logging.getLogger(name)
+            logger.setLevel(getattr(logging, self.config.LOG_LEVEL.upper()))
+            
+            # 移除之前的日志管理器添加的handler（重新初始化时），避免重复写入或写入已停止的队列
+            for handler in list(logger.handlers):
+                if isinstance(handler, _InProcessQueueHandler):
+                    logger.removeHandler(handler)
+            
+            # 文件输出 - 按日期切分
             # 默认日志文件名格式: prompt_project_log.2025-01-01.log
-            file_path = os.path.join(
-                self.config.LOG_DIR,
-                f'prompt_project_log'
-            )
-        
-        # 使用TimedRotatingFileHandler实现按日期切分
-        file_handler = TimedRotatingFileHandler(
-            filename=file_path,
-            when='midnight',  # 每天午夜切分
-            interval=1,  # 间隔1天
-            backupCount=30,  # 保留30天的日志
-            encoding='utf-8'
-        )
-        file_handler.suffix = "%Y-%m-%d.log"  # 文件后缀格式
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        
-        # 错误日志单独记录
-        error_file_path = os.path.join(
-            self.config.LOG_DIR,
-            'error_log'
-        )
-        error_handler = TimedRotatingFileHandler(
-            filename=error_file_path,
-            when='midnight',
-            interval=1,
-            backupCount=30,
-            encoding='utf-8'
-        )
-        error_handler.suffix = "%Y-%m-%d.log"
-        error_handler.setLevel(logging.ERROR)
-        error_handler.setFormatter(formatter)
-        logger.addHandler(error_handler)
-        
-        # 缓存logger
-        self.loggers[name] = logger
+            file_path = os.path.join(self.config.LOG_DIR, log_file or 'prompt_project_log')
+            
+            # 日志先进入队列，由后台线程格式化并写入
+            logger.addHandler(self._get_queue_handler(file_path))
+            
+            # 缓存logger
+            self._log_files[name] = log_file
+            self.loggers[name] = logger
         
         return logger
     
+    def restart_listeners(self):
+        """
+        重建后台写日志线程
+        gunicorn预加载应用后fork出的worker进程中没有父进程的线程，需要重新启动
+        """
+        for file_path, (queue_handler, handlers, _) in self._listeners.items():
+            log_queue = queue.SimpleQueue()
+            queue_handler.queue = log_queue
+            listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            self._listeners[file_path] = (queue_handler, handlers, listener)
+    
+    def stop_listeners(self):
+        """停止后台写日志线程，写完队列中剩余的日志"""
+        for _, _, listener in self._listeners.values():
+            listener.stop()
+        self._listeners.clear()
+    
+    def close(self):
+        """停止后台线程并关闭所有handler"""
+        handlers = {handler for _, handlers, _ in self._listeners.values() for handler in handlers}
+        self.stop_listeners()
+        for handler in handlers:
+            handler.close()
+    
     def get_request_logger(self):
         """获取请求日志记录器"""
         return self.get_logger('request', 'request.log')
@@ -132,10 +218,35 @@ def init_logger(config):
         config: 配置对象
     """
     global _logger_manager
-    _logger_manager = LoggerManager(config)
+    
+    with _lock:
+        previous = _logger_manager
+        _logger_manager = LoggerManager(config)
+    
+    # 重新初始化（如测试中多次创建应用）时，已获取过的logger按新配置重新配置，旧的后台线程写完后关闭
+    if previous is not None:
+        for name, log_file in previous._log_files.items():
+            _logger_manager.get_logger(name, log_file)
+        previous.close()
+    
     return _logger_manager
 
 
+def restart_listeners():
+    """fork后在子进程中重启后台写日志线程（gunicorn的post_fork钩子调用，见 app.reinit_after_fork）"""
+    if _logger_manager is not None:
+        _logger_manager.restart_listeners()
+
+
+def _stop_listeners():
+    """进程退出前写完队列中剩余的日志"""
+    if _logger_manager is not None:
+        _logger_manager.stop_listeners()
+
+
+atexit.register(_stop_listeners)
+
+
 def get_logger(name='app', log_file=None):
     """
     获取日志记录器
@@ -147,10 +258,13 @@ def get_logger(name='app', log_file=None):
     返回:
         Logger对象
     """
+    global _logger_manager
+    
     if _logger_manager is None:
-        # 如果还没初始化，使用默认配置
-        from config.config import get_config
-        init_logger(get_config())
+        # 如果还没初始化，使用默认配置（双重检查，多个线程同时首次获取时只创建一个管理器）
+        with _lock:
+            if _logger_manager is None:
+                _logger_manager = LoggerManager(get_config())
     
     return _logger_manager.get_logger(name, log_file)
 
@@ -173,17 +287,20 @@ def log_function_call(logger=None):
             if logger is None:
                 logger = get_logger()
             
-            # 记录函数调用
+            # 记录函数调用（参数和返回值的repr可能很大，未开启DEBUG级别时不格式化）
             func_name = func.__name__
-            logger.debug(f"调用函数 {func_name}, 参数: args={args}, kwargs={kwargs}")
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug("调用函数 %s, 参数: args=%r, kwargs=%r", func_name, args, kwargs)
             
             try:
                 # 执行函数
                 result = func(*args, **kwargs)
-                logger.debug(f"函数 {func_name} 执行成功, 返回: {result}")
+                if debug:
+                    logger.debug("函数 %s 执行成功, 返回: %r", func_name, result)
                 return result
             except Exception as e:
-                logger.error(f"函数 {func_name} 执行失败: {str(e)}", exc_info=True)
+                logger.error("函数 %s 执行失败: %s", func_name, e, exc_info=True)
                 raise
         
         return wrapper
@@ -205,11 +322,11 @@ def log_performance(logger=None):
             if logger is None:
                 logger = get_logger()
             
-            start_time = time.time()
+            start_time = time.perf_counter()
             result = func(*args, **kwargs)
-            elapsed_time = time.time() - start_time
+            elapsed_time = time.perf_counter() - start_time
             
-            logger.info(f"函数 {func.__name__} 执行耗时: {elapsed_time:.3f}秒")
+            logger.info("函数 %s 执行耗时: %.3f秒", func.__name__, elapsed_time)
             
             return result
         
@@ -0,0 +1,158 @@
+"""
+分页工具模块
+提供基于游标的键集分页（keyset pagination），避免OFFSET扫描和COUNT查询
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_, DateTime
+
+
+def encode_cursor(values):
+    """
+    将游标数据编码为不透明字符串
+    
+    参数:
+        values: 游标数据字典
+    
+    返回:
+        str: URL安全的base64字符串
+    """
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解码游标字符串
+    
+    参数:
+        cursor: encode_cursor生成的字符串
+    
+    返回:
+        dict: 游标数据，格式不正确时返回None
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        return None
+    
+    return values if isinstance(values, dict) else None
+
+
+def _is_int(value):
+    """判断是否为整数（bool是int的子类，不作为整数）"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _parse_sort_value(sort_column, value):
+    """
+    将游标中的排序值转换为排序列的类型
+    游标来自客户端，类型与列不符时直接拒绝，不带入查询
+    
+    参数:
+        sort_column: 排序列
+        value: 游标中的排序值
+    
+    返回:
+        可用于比较的排序值
+    
+    异常:
+        ValueError: 排序值与列类型不符
+    """
+    if value is None:
+        return None
+    
+    if isinstance(sort_column.type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError('无效的分页游标')
+        return datetime.fromisoformat(value)
+    
+    python_type = sort_column.type.python_type
+    if python_type is int:
+        valid = _is_int(value)
+    elif python_type is float:
+        valid = _is_int(value) or isinstance(value, float)
+    else:
+        valid = isinstance(value, python_type)
+    
+    if not valid:
+        raise ValueError('无效的分页游标')
+    return value
+
+
+def keyset_paginate(query, sort_column, id_column, cursor=None, limit=20, descending=True):
+    """
+    键集分页
+    按 (sort_column, id_column) 排序，从游标位置之后取 limit 条数据，
+    多取一条用于判断是否还有下一页
+    
+    参数:
+        query: 查询对象
+        sort_column: 排序列
+        id_column: 主键列，排序值相同时保证顺序稳定
+        cursor: 上一页返回的游标，None表示第一页
+        limit: 每页数量
+        descending: 是否倒序
+    
+    返回:
+        tuple: (数据列表, 下一页游标或None)
+    
+    异常:
+        ValueError: 游标格式不正确
+    """
+    is_datetime = isinstance(sort_column.type, DateTime)
+    
+    if cursor:
+        values = decode_cursor(cursor)
+        if values is None or 'v' not in values or 'id' not in values:
+            raise ValueError('无效的分页游标')
+        
+        if not _is_int(values['id']):
+            raise ValueError('无效的分页游标')
+        sort_value = _parse_sort_value(sort_column, values['v'])
+        
+        position = tuple_(sort_column, id_column)
+        boundary = tuple_(sort_value, values['id'])
+        query = query.filter(position < boundary if descending else position > boundary)
+    
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    
+    items = query.limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        sort_value = getattr(last, sort_column.key)
+        if is_datetime and sort_value is not None:
+            sort_value = sort_value.isoformat()
+        next_cursor = encode_cursor({'v': sort_value, 'id': getattr(last, id_column.key)})
+    
+    return items, next_cursor
+
+
+def seek_before(query, sort_column, id_column, before=None):
+    """
+    按 (sort_column, id_column) 倒序排列，并从指定位置之后继续取数据
+    供模型的"最近记录"查询使用，翻页时传入上一页最后一条记录的位置
+    
+    参数:
+        query: 查询对象
+        sort_column: 排序列
+        id_column: 主键列，排序值相同时保证顺序稳定
+        before: 上一页最后一条记录的 (排序值, id)，None表示从头开始
+    
+    返回:
+        添加了条件和排序的查询对象
+    """
+    if before is not None:
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(*before))
+    
+    return query.order_by(sort_column.desc(), id_column.desc())
@@ -3,8 +3,30 @@
 提供统一的API响应格式
 """
 
-from flask import jsonify
-from datetime import datetime
+import time
+
+import orjson
+from flask import current_app
+
+
+def _json_response(body, code):
+    """
+    构造JSON响应
+    直接用orjson序列化为字节串，中文按UTF-8原样输出，datetime序列化为ISO格式，
+    非字符串的键与标准库json一样转为字符串
+    
+    参数:
+        body: 响应数据
+        code: HTTP状态码
+    
+    返回:
+        Flask响应对象
+    """
+    return current_app.response_class(
+        orjson.dumps(body, default=current_app.json.default, option=orjson.OPT_NON_STR_KEYS),
+        status=code,
+        mimetype='application/json'
+    )
 
 
 def success_response(data=None, code=200):
@@ -22,9 +44,9 @@ def success_response(data=None, code=200):
         'code': code,
         'message': 'success',
         'data': data,
-        'timestamp': int(datetime.now().timestamp())
+        'timestamp': int(time.time())
     }
-    return jsonify(response), code
+    return _json_response(response, code)
 
 
 def error_response(code, message, errors=None):
@@ -42,13 +64,13 @@ def error_response(code, message, errors=None):
     response = {
         'code': code,
         'message': message,
-        'timestamp': int(datetime.now().timestamp())
+        'timestamp': int(time.time())
     }
     
     if errors:
         response['errors'] = errors
     
-    return jsonify(response), code
+    return _json_response(response, code)
 
 
 def paginate_response(items, pagination):
@@ -72,4 +94,28 @@ def paginate_response(items, pagination):
         }
     }
     
-    return success_response(data)
\ No newline at end of file
+    return success_response(data)
+
+
+def cursor_response(items, next_cursor, limit):
+    """
+    游标分页响应
+    
+    参数:
+        items: 数据项列表
+        next_cursor: 下一页游标，没有更多数据时为None
+        limit: 每页数量
+    
+    返回:
+        Flask响应对象
+    """
+    data = {
+        'items': items,
+        'pagination': {
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+    }
+    
+    return success_response(data)
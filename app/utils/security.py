@@ -0,0 +1,187 @@
+"""
+密码安全模块
+密码使用bcrypt哈希，成本由 BCRYPT_LOG_ROUNDS 配置；升级前的Werkzeug PBKDF2哈希仍可验证，
+验证通过后由调用方按 needs_rehash 重新哈希。
+密码哈希的计算是刻意设计成CPU密集型的操作，
+配置了进程池时在独立进程中执行，不占用处理请求的工作线程
+"""
+
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash
+
+# bcrypt只使用密码的前72个字节
+BCRYPT_MAX_BYTES = 72
+
+# bcrypt哈希的前缀
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+# 未配置时的默认成本
+DEFAULT_LOG_ROUNDS = 12
+
+# 不存在的用户登录时用于验证的哈希: 成本 -> 随机密码的哈希
+# 与真实用户相同成本，使两种情况下的验证耗时一致
+_dummy_hashes = {}
+_dummy_hashes_lock = threading.Lock()
+
+# 密码哈希进程池及创建它的进程ID
+# 进程池的队列和管理线程不能跨fork使用，按进程ID判断，每个进程使用自己创建的进程池
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def init_password_pool(app):
+    """
+    初始化密码哈希进程池配置
+    PASSWORD_HASH_WORKERS 为0时不使用进程池，在当前线程中直接计算；
+    进程池在当前进程第一次计算哈希时才创建，gunicorn预加载应用时master进程不创建，fork出的每个worker各自创建
+    
+    参数:
+        app: Flask应用实例
+    """
+    app.extensions['password_pool_workers'] = app.config.get('PASSWORD_HASH_WORKERS', 0)
+
+
+def reset_password_pool():
+    """
+    丢弃从父进程继承的进程池引用（fork后在子进程中调用）
+    不关闭它：进程池属于父进程，子进程下次计算哈希时创建自己的进程池
+    """
+    global _pool, _pool_pid
+    
+    with _pool_lock:
+        _pool = None
+        _pool_pid = None
+
+
+def _get_pool():
+    """获取当前进程的密码哈希进程池，未配置时返回None"""
+    global _pool, _pool_pid
+    
+    if not has_app_context():
+        return None
+    
+    workers = current_app.extensions.get('password_pool_workers', 0)
+    if workers <= 0:
+        return None
+    
+    pid = os.getpid()
+    if _pool_pid != pid:
+        with _pool_lock:
+            if _pool_pid != pid:
+                _pool = ProcessPoolExecutor(max_workers=workers)
+                _pool_pid = pid
+    
+    return _pool
+
+
+def _run(func, *args):
+    """
+    执行密码哈希任务，有进程池时提交到进程池并等待结果
+    
+    参数:
+        func: 模块级函数（需要可被pickle）
+        *args: 函数参数
+    """
+    pool = _get_pool()
+    if pool is None:
+        return func(*args)
+    
+    future = pool.submit(func, *args)
+    return future.result(timeout=current_app.config.get('PASSWORD_HASH_TIMEOUT', 10))
+
+
+def _log_rounds():
+    """当前配置的bcrypt成本"""
+    if has_app_context():
+        return current_app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_LOG_ROUNDS)
+    return DEFAULT_LOG_ROUNDS
+
+
+def _password_bytes(password):
+    """密码编码为bcrypt的输入（超出72字节的部分bcrypt本就忽略，显式截断）"""
+    return password.encode('utf-8')[:BCRYPT_MAX_BYTES]
+
+
+def _bcrypt_hash(password, rounds):
+    """计算bcrypt哈希（在进程池中执行）"""
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(rounds)).decode('ascii')
+
+
+def _check(password_hash, password):
+    """验证密码哈希（在进程池中执行），兼容升级前的PBKDF2哈希"""
+    if password_hash.startswith(BCRYPT_PREFIXES):
+        return bcrypt.checkpw(_password_bytes(password), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+
+def hash_password(password):
+    """
+    计算密码哈希
+    
+    参数:
+        password: 明文密码
+    
+    返回:
+        str: 密码哈希
+    """
+    return _run(_bcrypt_hash, password, _log_rounds())
+
+
+def verify_password(password_hash, password):
+    """
+    验证密码
+    
+    参数:
+        password_hash: 密码哈希
+        password: 明文密码
+    
+    返回:
+        bool: 密码是否正确
+    """
+    return _run(_check, password_hash, password)
+
+
+def verify_dummy_password(password):
+    """
+    对不存在的用户执行一次耗时相同的密码验证，结果总是失败
+    登录时无论用户是否存在都计算一次哈希，响应时间不会泄露账号是否存在
+    
+    参数:
+        password: 明文密码
+    
+    返回:
+        bool: 总是False
+    """
+    rounds = _log_rounds()
+    if rounds not in _dummy_hashes:
+        with _dummy_hashes_lock:
+            if rounds not in _dummy_hashes:
+                _dummy_hashes[rounds] = _bcrypt_hash(secrets.token_urlsafe(32), rounds)
+    
+    verify_password(_dummy_hashes[rounds], password)
+    return False
+
+
+def needs_rehash(password_hash):
+    """
+    判断密码哈希是否需要用当前配置重新计算
+    非bcrypt哈希（升级前的PBKDF2）或成本与配置不同时需要
+    
+    参数:
+        password_hash: 密码哈希
+    
+    返回:
+        bool: 是否需要重新哈希
+    """
+    if not password_hash.startswith(BCRYPT_PREFIXES):
+        return True
+    
+    # bcrypt哈希格式: $2b$<成本>$<盐和哈希>
+    return int(password_hash[4:6]) != _log_rounds()
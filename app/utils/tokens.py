@@ -0,0 +1,98 @@
+"""
+Token计数模块
+使用tiktoken按模型的BPE编码计数，编码器在应用启动时加载；
+tiktoken不可用或编码器未加载时按字符数估算
+"""
+
+from app.utils.logger import get_logger
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken为可选依赖
+    tiktoken = None
+
+# 默认编码，tiktoken无法识别的模型使用该编码
+DEFAULT_ENCODING = 'cl100k_base'
+
+# 启动时加载的编码器: 编码名 -> Encoding对象
+# 只在启动时写入（gunicorn预加载应用时在master进程中加载，worker通过fork继承），请求中只读
+_encoders = {}
+
+
+def _encoding_name(model):
+    """
+    获取模型对应的编码名（由tiktoken按模型名称判断，不加载编码文件）
+    
+    参数:
+        model: 模型名称
+    
+    返回:
+        str: 编码名
+    """
+    if not model:
+        return DEFAULT_ENCODING
+    
+    try:
+        return tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        return DEFAULT_ENCODING
+
+
+def init_token_encoders(app):
+    """
+    加载配置中各模型的编码器及默认编码器
+    加载需要下载或从 TIKTOKEN_CACHE_DIR 读取BPE文件，在启动时完成，不在请求线程中加载；
+    加载失败只记录警告，对应编码的计数改用估算
+    
+    参数:
+        app: Flask应用实例
+    """
+    models = app.config.get('TOKEN_ENCODER_MODELS', [])
+    if tiktoken is None or not models:
+        return
+    
+    for name in {DEFAULT_ENCODING, *map(_encoding_name, models)}:
+        if name in _encoders:
+            continue
+        
+        try:
+            _encoders[name] = tiktoken.get_encoding(name)
+        except Exception as e:
+            get_logger('app').warning(f"加载tiktoken编码 {name} 失败，改用估算: {str(e)}")
+
+
+def estimate_tokens(text):
+    """
+    按字符数估算token数
+    ASCII字符约4个一个token，中文等非ASCII字符约每个字符一个token
+    
+    参数:
+        text: 文本
+    
+    返回:
+        int: 估算的token数
+    """
+    ascii_count = len(text.encode('ascii', 'ignore'))
+    return (len(text) - ascii_count) + (ascii_count + 3) // 4
+
+
+def count_tokens(text, model=None):
+    """
+    计算文本的token数
+    
+    参数:
+        text: 文本
+        model: 模型名称
+    
+    返回:
+        int: token数
+    """
+    if not text:
+        return 0
+    
+    encoder = _encoders.get(_encoding_name(model)) if _encoders else None
+    if encoder is None:
+        return estimate_tokens(text)
+    
+    # 不处理特殊token，速度更快
+    return len(encoder.encode_ordinary(text))
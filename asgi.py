@@ -0,0 +1,16 @@
+"""
+ASGI入口文件
+通过asgiref把Flask(WSGI)应用包装为ASGI应用，供uvicorn等ASGI服务器加载
+
+启动命令（需要额外安装uvicorn）:
+    uvicorn asgi:app --host 0.0.0.0 --port 5002 --workers 4
+
+说明: 视图函数和数据库访问仍然是同步的，由asgiref在线程池中执行，
+默认部署方式仍然是gunicorn（见 gunicorn.conf.py）
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+
+from wsgi import app as wsgi_app
+
+app = WsgiToAsgi(wsgi_app)
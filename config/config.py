@@ -5,11 +5,23 @@
 
 import os
 from datetime import timedelta
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
+
+def _default_password_hash_workers():
+    """
+    生产环境每个gunicorn worker的密码哈希进程数
+    整机的CPU核数在所有worker之间分配，避免每个worker各开CPU核数个进程
+    """
+    cpus = os.cpu_count() or 1
+    workers = int(os.getenv('GUNICORN_WORKERS', 2 * cpus + 1))
+    return max(1, cpus // workers)
+
+
 class Config:
     """基础配置类"""
     
@@ -28,10 +40,32 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # 禁用修改追踪，提升性能
     SQLALCHEMY_ECHO = False  # 是否打印SQL语句
     
+    # 数据库连接池配置
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # 常驻连接数
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))  # 高峰期额外连接数
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))  # 获取连接的等待超时（秒）
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # 连接回收时间（秒），避免使用被服务端断开的连接
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 5))  # 建立连接的超时（秒）
+    DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 30000))  # 只读查询的最长执行时间（毫秒），0表示不限制
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,  # 取出连接时先检测是否可用，数据库重启后自动重连
+        'connect_args': {
+            'connect_timeout': DB_CONNECT_TIMEOUT,
+            # MySQL的 max_execution_time 只作用于SELECT，慢查询超时后中止，不会长期占用连接
+            'init_command': f'SET SESSION max_execution_time={DB_STATEMENT_TIMEOUT}',
+        },
+    }
+    
     # JWT配置
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 86400)))
     JWT_ALGORITHM = 'HS256'
+    JWT_DECODE_CACHE_SIZE = int(os.getenv('JWT_DECODE_CACHE_SIZE', 10000))  # 解码结果缓存条数
+    JWT_DECODE_CACHE_TTL = int(os.getenv('JWT_DECODE_CACHE_TTL', 60))  # 解码结果缓存秒数
     
     # OpenAI配置
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
@@ -47,12 +81,15 @@ class Config:
     LOG_MAX_BYTES = 10 * 1024 * 1024  # 10MB
     LOG_BACKUP_COUNT = 10
     
+    # 跳过计时和请求日志的轻量接口（如频繁调用的健康检查、API信息）
+    REQUEST_LOG_SKIP_PATHS = os.getenv('REQUEST_LOG_SKIP_PATHS', '/health,/healthz,/api').split(',')
+    
     # 应用配置
     APP_PORT = int(os.getenv('APP_PORT', 5002))
     APP_HOST = os.getenv('APP_HOST', '0.0.0.0')
     
-    # 跨域配置
-    CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
+    # 跨域配置（只做成员判断，加载时即转为frozenset）
+    CORS_ORIGINS = frozenset(os.getenv('CORS_ORIGINS', '*').split(','))
     
     # 文件上传配置
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
@@ -60,17 +97,37 @@ class Config:
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     
     # Redis配置（可选）
+    REDIS_ENABLED = os.getenv('REDIS_ENABLED', '0') == '1'  # 是否启用Redis缓存
     REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
     REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
     REDIS_DB = int(os.getenv('REDIS_DB', 0))
     REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', None)
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.2))  # 读写超时（秒）
+    
+    # 缓存过期时间（秒）
+    TAG_CACHE_TTL = int(os.getenv('TAG_CACHE_TTL', 300))
+    USER_SETTINGS_CACHE_TTL = int(os.getenv('USER_SETTINGS_CACHE_TTL', 600))
+    
+    # 缓冲计数（查看次数）合并写库的间隔（秒），需启用Redis
+    COUNTER_FLUSH_INTERVAL = int(os.getenv('COUNTER_FLUSH_INTERVAL', 30))
+    
+    # 自动保存去重窗口（秒），窗口内相同内容的重复自动保存不写库
+    AUTOSAVE_DEDUP_SECONDS = int(os.getenv('AUTOSAVE_DEDUP_SECONDS', 5))
+    
+    # 启动时加载Token编码器的模型（逗号分隔），为空时不加载，测试记录的token数按字符数估算
+    TOKEN_ENCODER_MODELS = [m for m in os.getenv('TOKEN_ENCODER_MODELS', 'gpt-5').split(',') if m]
     
     # 分页配置
     DEFAULT_PAGE_SIZE = 20
     MAX_PAGE_SIZE = 100
     
     # 安全配置
-    BCRYPT_LOG_ROUNDS = 12  # 密码加密轮次
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))  # bcrypt成本（2的幂次轮），调整后已有密码在下次登录时重新哈希
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0))  # 每个进程的密码哈希进程数，0表示在请求线程中计算
+    PASSWORD_HASH_TIMEOUT = int(os.getenv('PASSWORD_HASH_TIMEOUT', 10))  # 等待密码哈希结果的超时（秒）
+    
+    # 启动时是否自动创建数据库表（也可以使用 flask init-db 命令）
+    INIT_DB = os.getenv('FLASK_INIT_DB', '0') == '1'
     
     # 自动保存配置
     AUTO_SAVE_INTERVAL = 3  # 秒
@@ -83,11 +140,31 @@ class DevelopmentConfig(Config):
     LOG_LEVEL = 'DEBUG'
 
 
+class TestingConfig(Config):
+    """
+    测试环境配置（pytest）
+    默认使用SQLite内存数据库；TEST_DATABASE_URL 可指向专用的MySQL测试库（在空库中建表，同时创建触发器）
+    """
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite://')
+    # 连接池和连接参数只适用于MySQL
+    SQLALCHEMY_ENGINE_OPTIONS = (
+        Config.SQLALCHEMY_ENGINE_OPTIONS if SQLALCHEMY_DATABASE_URI.startswith('mysql') else {}
+    )
+    LOG_LEVEL = 'WARNING'
+    REDIS_ENABLED = False
+    INIT_DB = False
+    BCRYPT_LOG_ROUNDS = 4  # bcrypt允许的最低成本，测试中哈希更快
+    PASSWORD_HASH_WORKERS = 0
+    TOKEN_ENCODER_MODELS = []  # 不下载BPE文件
+
+
 class ProductionConfig(Config):
     """生产环境配置"""
     DEBUG = False
     SQLALCHEMY_ECHO = False
     LOG_LEVEL = 'INFO'
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', _default_password_hash_workers()))
     
     # 生产环境强制要求配置
     @classmethod
@@ -108,6 +185,7 @@ class ProductionConfig(Config):
 config_map = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
 
@@ -125,6 +203,21 @@ def get_config(env=None):
     if env is None:
         env = os.getenv('FLASK_ENV', 'development')
     
+    return _load_config(env)
+
+
+@lru_cache(maxsize=8)
+def _load_config(env):
+    """
+    按环境名称获取配置类并验证
+    环境变量在进程内不变，每个环境只验证一次
+    
+    参数:
+        env: 环境名称
+    
+    返回:
+        配置对象
+    """
     config_class = config_map.get(env, DevelopmentConfig)
     
     # 生产环境验证配置
@@ -0,0 +1,51 @@
+"""
+pytest公共夹具
+应用在整个测试会话中只创建一次（testing配置，默认SQLite内存数据库，见 config.TestingConfig）；
+每个测试在一个外层事务中运行，结束时整体回滚，不需要清理数据
+"""
+
+import pytest
+from sqlalchemy import orm
+
+from app import create_app
+from app.models.base import db
+
+# 不由pytest收集的路径：
+# 脚本式测试（需要运行中的服务或直接写库）用 python 直接运行；
+# app 下的 test_record.py 是模型模块；prompt_claude_v2 是虚拟环境目录
+collect_ignore = ['test_jwt.py', 'test_save_flow.py', 'app', 'prompt_claude_v2']
+
+
+@pytest.fixture(scope='session')
+def app():
+    """测试会话共用的Flask应用，启动时建表"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def db_session(app):
+    """
+    绑定到外层事务的数据库会话
+    测试期间 db.session 替换为绑定到该连接的会话，commit只释放SAVEPOINT，测试结束后整个事务回滚
+    """
+    with app.app_context():
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        
+        original_session = db.session
+        db.session = orm.scoped_session(orm.sessionmaker(
+            bind=connection,
+            join_transaction_mode='create_savepoint',
+            query_cls=db.Query
+        ))
+        
+        try:
+            yield db.session
+        finally:
+            db.session.remove()
+            db.session = original_session
+            transaction.rollback()
+            connection.close()
@@ -0,0 +1,8 @@
+-- Prompt列表游标分页索引
+-- 列表按作者筛选后按 (created_at, id) 排序分页，该索引使翻页只扫描 limit+1 行
+-- 新建数据库由 db.create_all() 自动创建此索引，已有数据库执行本脚本
+
+USE prompt_manager;
+
+CREATE INDEX idx_prompts_author_created
+    ON prompts (author_id, is_deleted, created_at, id);
@@ -0,0 +1,15 @@
+-- Prompt列表其余排序方式的索引及标签筛选索引
+-- 列表按 updated_at、star_count 排序时同样走索引顺序扫描，不再对作者的全部Prompt做filesort；
+-- 按标签筛选时 (tag_id, prompt_id) 索引覆盖关联查询
+-- 新建数据库由 db.create_all() 自动创建这些索引，已有数据库执行本脚本
+
+USE prompt_manager;
+
+CREATE INDEX idx_prompts_author_updated
+    ON prompts (author_id, is_deleted, updated_at, id);
+
+CREATE INDEX idx_prompts_author_star
+    ON prompts (author_id, is_deleted, star_count, id);
+
+CREATE INDEX idx_prompt_tags_tag_prompt
+    ON prompt_tags (tag_id, prompt_id);
@@ -0,0 +1,18 @@
+-- 操作日志复合索引
+-- 按用户、按目标查询日志时按 created_at 倒序取最近的记录，
+-- 复合索引使 ORDER BY created_at DESC LIMIT N 直接按索引顺序读取，不再filesort
+-- 新建数据库由 db.create_all() 自动创建这些索引，已有数据库执行本脚本
+
+USE prompt_manager;
+
+-- 先创建新索引，user_id 外键需要以 user_id 开头的索引
+CREATE INDEX idx_user_created
+    ON operation_logs (user_id, created_at);
+
+CREATE INDEX idx_target_created
+    ON operation_logs (target_type, target_id, created_at);
+
+-- 旧的单列索引已被复合索引的前缀覆盖
+DROP INDEX idx_user_id ON operation_logs;
+
+DROP INDEX idx_target ON operation_logs;
@@ -0,0 +1,9 @@
+-- 测试记录按模型统计的覆盖索引
+-- get_model_statistics 按 prompt_id 筛选后按 model_name 分组统计 status 和 response_time，
+-- 该索引包含所需的全部列，统计时只扫描索引
+-- 新建数据库由 db.create_all() 自动创建此索引，已有数据库执行本脚本
+
+USE prompt_manager;
+
+CREATE INDEX idx_test_records_prompt_model
+    ON test_records (prompt_id, model_name, status, response_time);
@@ -0,0 +1,8 @@
+-- 协作记录按用户查询的索引
+-- get_user_collaborations 按 user_id 筛选 accepted_at IS NOT NULL 的记录，走索引范围扫描
+-- 新建数据库由 db.create_all() 自动创建此索引，已有数据库执行本脚本
+
+USE prompt_manager;
+
+CREATE INDEX idx_collaborations_user_accepted
+    ON collaborations (user_id, accepted_at);
@@ -0,0 +1,9 @@
+-- Prompt关键词搜索全文索引
+-- 搜索由三个 LIKE '%关键词%' 改为 MATCH(title, content, description) AGAINST(...)，
+-- 使用ngram分词器以支持中文（分词长度由 ngram_token_size 控制，默认2）
+-- 新建数据库由 db.create_all() 自动创建此索引，已有数据库执行本脚本
+
+USE prompt_manager;
+
+ALTER TABLE prompts
+    ADD FULLTEXT INDEX ft_prompts_search (title, content, description) WITH PARSER ngram;
@@ -0,0 +1,20 @@
+-- 标签使用次数改由触发器维护
+-- prompt_tags 插入/删除关联行时同步更新 tags.use_count，应用不再单独执行计数UPDATE
+-- 新建数据库由 db.create_all() 自动创建触发器，已有数据库执行本脚本
+-- 注意：部署新代码前先执行本脚本，否则期间新增/移除的标签不会计数
+-- 注意：触发器会更新 tags，写 prompt_tags 的语句不能同时读取 tags（如 INSERT ... SELECT FROM tags），
+--       否则MySQL报错1442
+
+USE prompt_manager;
+
+CREATE TRIGGER trg_prompt_tags_after_insert AFTER INSERT ON prompt_tags
+FOR EACH ROW
+    UPDATE tags SET use_count = use_count + 1 WHERE id = NEW.tag_id;
+
+CREATE TRIGGER trg_prompt_tags_after_delete AFTER DELETE ON prompt_tags
+FOR EACH ROW
+    UPDATE tags SET use_count = use_count - 1 WHERE id = OLD.tag_id AND use_count > 0;
+
+-- 按关联表重新校准现有计数
+UPDATE tags t
+SET t.use_count = (SELECT COUNT(*) FROM prompt_tags pt WHERE pt.tag_id = t.id);
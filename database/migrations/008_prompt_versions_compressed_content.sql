@@ -0,0 +1,9 @@
+-- 版本内容压缩存储
+-- prompt_versions.content 由 TEXT 改为 BLOB，应用写入时对长内容进行zlib压缩（带前缀区分），
+-- 原有数据按UTF-8字节原样保留，读取时无需转换
+-- 新建数据库由 db.create_all() 自动创建，已有数据库执行本脚本
+
+USE prompt_manager;
+
+ALTER TABLE prompt_versions
+    MODIFY COLUMN content BLOB NOT NULL COMMENT '版本内容';
@@ -0,0 +1,28 @@
+-- 用户Prompt数量计数列
+-- users.prompts_count 记录用户未删除的Prompt数量，由 prompts 表的触发器维护，
+-- 个人资料等显示Prompt数量的地方直接读取该列，不再执行 COUNT 查询
+-- 新建数据库由 db.create_all() 自动创建，已有数据库执行本脚本
+
+USE prompt_manager;
+
+ALTER TABLE users
+    ADD COLUMN prompts_count INT NOT NULL DEFAULT 0 COMMENT 'Prompt数量';
+
+CREATE TRIGGER trg_prompts_after_insert AFTER INSERT ON prompts
+FOR EACH ROW
+    UPDATE users SET prompts_count = prompts_count + 1
+    WHERE id = NEW.author_id AND NEW.is_deleted = 0;
+
+CREATE TRIGGER trg_prompts_after_update AFTER UPDATE ON prompts
+FOR EACH ROW
+    UPDATE users SET prompts_count = prompts_count + (OLD.is_deleted - NEW.is_deleted)
+    WHERE id = NEW.author_id AND OLD.is_deleted <> NEW.is_deleted;
+
+CREATE TRIGGER trg_prompts_after_delete AFTER DELETE ON prompts
+FOR EACH ROW
+    UPDATE users SET prompts_count = prompts_count - 1
+    WHERE id = OLD.author_id AND OLD.is_deleted = 0 AND prompts_count > 0;
+
+-- 按现有数据初始化计数
+UPDATE users u
+SET u.prompts_count = (SELECT COUNT(*) FROM prompts p WHERE p.author_id = u.id AND p.is_deleted = 0);
@@ -0,0 +1,12 @@
+-- 校正Prompt版本计数
+-- create_version 改为读取加锁的 prompts.version_count 分配下一个版本号，不再查询 max(version_number)，
+-- 要求 version_count 等于该Prompt最新的版本号；早期数据的 version_count 默认值为1且可能与版本记录不一致，
+-- 不校正会分配出已存在的版本号（违反 uk_prompt_version）
+-- 已有数据库在部署新版本前执行本脚本，新建数据库不需要执行
+
+USE prompt_manager;
+
+UPDATE prompts p
+SET p.version_count = (
+    SELECT COALESCE(MAX(v.version_number), 0) FROM prompt_versions v WHERE v.prompt_id = p.id
+);
@@ -0,0 +1,50 @@
+"""
+gunicorn配置文件
+生产环境默认使用gthread工作模式，让I/O密集的认证/数据库请求可以并发处理。
+Prompt测试（流式输出）和自动保存等长时间等待I/O的请求较多时，
+可设置 GUNICORN_WORKER_CLASS=gevent 改用协程模式（需要安装gevent），
+每个进程可同时挂起数百个请求，而不是每个请求占用一个线程
+
+启动命令:
+    python -m gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+
+# 监听地址，与应用配置保持一致
+host = os.getenv('APP_HOST', '0.0.0.0')
+port = int(os.getenv('APP_PORT', 5002))
+bind = f"{host}:{port}"
+
+# 工作进程：gthread模式每个进程内使用线程池处理请求
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', 2 * (os.cpu_count() or 1) + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# gevent模式下每个进程同时处理的最大连接数
+# 数据库连接仍受连接池限制（DB_POOL_SIZE + DB_MAX_OVERFLOW），超出的请求在池上排队；
+# PyMySQL和redis-py为纯Python实现，gunicorn的gevent worker打补丁后即可协作式让出。
+# 密码哈希进程池（PASSWORD_HASH_WORKERS）与gevent混用不稳定，该模式下应保持为0
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 500))
+
+# 请求超时（秒），流式测试输出耗时较长，不宜过短
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# 保持连接时间（秒）
+keepalive = 5
+
+# 在fork之前加载应用，create_app()只执行一次，子进程共享已加载的代码
+# master中已创建的连接、后台线程和进程池由post_fork在每个worker中重建
+preload_app = True
+
+# 日志输出到标准输出，由容器收集
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """worker进程fork后重建进程级资源（数据库/Redis连接、后台线程、密码哈希进程池）"""
+    from app import reinit_after_fork
+    from wsgi import app
+    
+    reinit_after_fork(app)
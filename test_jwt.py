@@ -4,17 +4,22 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 
 # 基础URL
 BASE_URL = "http://localhost:5002"
 
+# 所有请求共用一个会话，复用到服务器的TCP连接（keep-alive）
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
 def test_login():
     """测试登录并获取token"""
     print("=" * 50)
     print("1. 测试登录...")
     
-    response = requests.post(
+    response = SESSION.post(
         f"{BASE_URL}/api/v1/auth/login",
         json={
             "email": "test@example.com",
@@ -29,6 +34,10 @@ def test_login():
         data = response.json()
         token = data.get('data', {}).get('token')
         print(f"获取到的Token: {token[:50] if token else 'None'}...")
+        
+        # 登录后的请求都带上token
+        if token:
+            SESSION.headers['Authorization'] = f'Bearer {token}'
         return token
     return None
 
@@ -37,18 +46,14 @@ def test_create_prompt(token):
     print("=" * 50)
     print("2. 测试创建Prompt...")
     
-    headers = {}
     if token:
-        headers['Authorization'] = f'Bearer {token}'
         print(f"Authorization header: Bearer {token[:20]}...")
     else:
         print("警告：没有token")
     
-    headers['Content-Type'] = 'application/json'
-    
-    response = requests.post(
+    # Authorization由会话统一携带，json参数自动设置Content-Type
+    response = SESSION.post(
         f"{BASE_URL}/api/v1/prompts",
-        headers=headers,
         json={
             "title": "测试标题",
             "content": "测试内容",
@@ -61,21 +66,14 @@ def test_create_prompt(token):
     print(f"响应内容: {response.text[:200] if response.text else 'None'}...")
     
     # 打印请求头（调试用）
-    print(f"发送的请求头: {headers}")
+    print(f"发送的请求头: {dict(response.request.headers)}")
 
 def test_get_tags(token):
     """测试获取标签列表"""
     print("=" * 50)
     print("3. 测试获取标签...")
     
-    headers = {}
-    if token:
-        headers['Authorization'] = f'Bearer {token}'
-    
-    response = requests.get(
-        f"{BASE_URL}/api/v1/tags",
-        headers=headers
-    )
+    response = SESSION.get(f"{BASE_URL}/api/v1/tags")
     
     print(f"状态码: {response.status_code}")
     print(f"响应内容: {response.text[:200] if response.text else 'None'}...")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+测试键集分页的游标解析
+游标来自客户端，格式或类型不正确时 keyset_paginate 抛出ValueError（接口返回400），不带入查询
+运行: pytest test_pagination.py
+"""
+
+import pytest
+
+from app.models.prompt import Prompt, PromptVersion
+from app.models.user import User
+from app.models.base import db
+from app.utils.pagination import encode_cursor, keyset_paginate
+
+
+@pytest.fixture
+def prompt_id(db_session):
+    """有3个版本的Prompt（只flush获取ID，随事务回滚）"""
+    user = User(username='page_tester', email='page_tester@example.com', password_hash='')
+    user.stage()
+    db.session.flush()
+    
+    prompt = Prompt(title='分页测试Prompt', content='内容', author_id=user.id)
+    prompt.stage()
+    db.session.flush()
+    
+    for _ in range(3):
+        prompt.create_version(change_summary='分页测试')
+    db.session.flush()
+    return prompt.id
+
+
+def _versions(prompt_id, cursor=None):
+    """按版本号倒序分页，每页2条"""
+    query = PromptVersion.query.filter_by(prompt_id=prompt_id)
+    return keyset_paginate(query, PromptVersion.version_number, PromptVersion.id, cursor=cursor, limit=2)
+
+
+def test_cursor_round_trip(prompt_id):
+    """使用返回的游标取下一页"""
+    first_page, cursor = _versions(prompt_id)
+    assert [v.version_number for v in first_page] == [3, 2]
+    
+    second_page, cursor = _versions(prompt_id, cursor)
+    assert [v.version_number for v in second_page] == [1]
+    assert cursor is None
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-base64!',
+    encode_cursor([1, 2]),
+    encode_cursor({'v': 1}),
+    encode_cursor({'v': 1, 'id': {'a': 1}}),
+    encode_cursor({'v': 1, 'id': '1'}),
+    encode_cursor({'v': 1, 'id': True}),
+    encode_cursor({'v': [1], 'id': 1}),
+    encode_cursor({'v': 'notadate', 'id': 1}),
+    encode_cursor({'v': 1.5, 'id': 1}),
+])
+def test_malformed_cursor_int_column(prompt_id, cursor):
+    """整数排序列（版本号）: 排序值和id必须是整数"""
+    with pytest.raises(ValueError):
+        _versions(prompt_id, cursor)
+
+
+@pytest.mark.parametrize('values', [
+    {'v': 'notadate', 'id': 1},
+    {'v': 1, 'id': 1},
+    {'v': '2026-01-01T00:00:00', 'id': {'a': 1}},
+])
+def test_malformed_cursor_datetime_column(db_session, values):
+    """时间排序列: 排序值必须是ISO格式的时间字符串"""
+    with pytest.raises(ValueError):
+        keyset_paginate(Prompt.query, Prompt.created_at, Prompt.id, cursor=encode_cursor(values))
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-v']))
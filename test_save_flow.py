@@ -13,9 +13,25 @@ from app.models.base import db
 from app.models.user import User
 from app.models.prompt import Prompt, PromptVersion
 from app.models.tag import Tag
-from sqlalchemy import text
+from sqlalchemy import text, select, func, event
+from sqlalchemy.orm import raiseload
+from contextlib import contextmanager
 import json
 
+@contextmanager
+def count_queries():
+    """统计代码块内执行的SQL语句数"""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
 def test_database_connection():
     """测试数据库连接"""
     print("=" * 50)
@@ -78,10 +94,9 @@ def test_prompt_save():
             author_id=test_user.id
         )
         
+        # 先flush得到Prompt ID，与版本记录在同一事务中提交
         db.session.add(new_prompt)
-        db.session.commit()
-        
-        print(f"✅ Prompt保存成功，ID: {new_prompt.id}")
+        db.session.flush()
         
         # 创建版本记录
         version = PromptVersion(
@@ -97,6 +112,7 @@ def test_prompt_save():
         db.session.add(version)
         db.session.commit()
         
+        print(f"✅ Prompt保存成功，ID: {new_prompt.id}")
         print(f"✅ 版本记录创建成功，版本号: {version.version_number}")
         
         return new_prompt
@@ -155,18 +171,31 @@ def test_prompt_query():
     print("5. 测试Prompt查询功能...")
     
     try:
-        # 获取测试用户的所有Prompt
         test_user = User.query.filter_by(email='test@example.com').first()
-        prompts = Prompt.query.filter_by(author_id=test_user.id, is_deleted=False).all()
+        
+        with count_queries() as statements:
+            # 获取测试用户的所有Prompt（只用到列，不预加载标签等关系）
+            prompts = Prompt.query.filter_by(author_id=test_user.id, is_deleted=False).options(
+                raiseload('*')
+            ).all()
+            
+            # 所有Prompt的版本数一次分组查询得到，不逐个查询版本
+            version_counts = dict(db.session.execute(
+                select(PromptVersion.prompt_id, func.count())
+                .where(PromptVersion.prompt_id.in_([prompt.id for prompt in prompts]))
+                .group_by(PromptVersion.prompt_id)
+            ).all())
         
         print(f"✅ 查询到 {len(prompts)} 个Prompt")
         
         for prompt in prompts:
             print(f"  - ID: {prompt.id}, 标题: {prompt.title}, 创建时间: {prompt.created_at}")
-            
-            # 获取版本信息
-            versions = PromptVersion.query.filter_by(prompt_id=prompt.id).all()
-            print(f"    版本数: {len(versions)}")
+            print(f"    版本数: {version_counts.get(prompt.id, 0)}")
+        
+        # 查询数不随Prompt数量增长
+        if len(statements) > 2:
+            print(f"❌ 查询Prompt及版本数执行了 {len(statements)} 条SQL，预期不超过2条")
+            return False
         
         return True
     except Exception as e:
@@ -1,143 +1,133 @@
 #!/usr/bin/env python3
 """
 测试标签更新功能
-验证修复后的标签更新逻辑是否正常工作
+验证 Prompt.sync_tags 的标签更新逻辑，测试用户和标签在每个用例的事务中创建，结束后回滚
+运行: pytest test_tag_update.py（默认使用SQLite内存数据库，TEST_DATABASE_URL 可指向MySQL测试库）
 """
 
-from app import create_app
+import pytest
+
+from config.config import TestingConfig
 from app.models.prompt import Prompt
 from app.models.tag import Tag, PromptTag
 from app.models.user import User
 from app.models.base import db
 
-def test_tag_update():
-    """测试标签更新功能"""
-    app = create_app()
+# 标签使用次数的触发器只在MySQL中创建（见 app.models.tag.USE_COUNT_TRIGGERS）
+requires_mysql = pytest.mark.skipif(
+    not TestingConfig.SQLALCHEMY_DATABASE_URI.startswith('mysql'),
+    reason='需要 TEST_DATABASE_URL 指向MySQL测试库'
+)
+
+
+def _prompt_tag_ids(prompt_id):
+    """查询Prompt当前的标签ID（只查询tag_id列，不构造PromptTag对象）"""
+    return set(db.session.scalars(
+        db.select(PromptTag.tag_id).where(PromptTag.prompt_id == prompt_id)
+    ))
+
+
+def _use_counts(tag_ids):
+    """查询标签的使用次数: 标签ID -> use_count"""
+    return dict(db.session.execute(
+        db.select(Tag.id, Tag.use_count).where(Tag.id.in_(tag_ids))
+    ).all())
+
+
+@pytest.fixture
+def test_prompt(db_session):
+    """测试用户的一个新Prompt（只flush获取ID，随事务回滚）"""
+    test_user = User(username='tag_tester', email='tag_tester@example.com', password_hash='')
+    test_user.stage()
+    db.session.flush()
+    
+    prompt = Prompt(
+        title="标签测试Prompt",
+        content="用于测试标签更新功能",
+        description="测试描述",
+        author_id=test_user.id
+    )
+    prompt.stage()
+    db.session.flush()
+    return prompt
+
+
+@pytest.fixture
+def tag_ids(db_session):
+    """新建3个标签，返回它们的ID"""
+    tags = [Tag(name=f'标签测试{i}') for i in range(3)]
+    db.session.add_all(tags)
+    db.session.flush()
+    return [tag.id for tag in tags]
+
+
+# 更新用例: (初始标签, 新标签列表, 预期的最终标签, 是否有变化, 更新后各标签的使用次数)
+# 标签用下标表示，对应 tag_ids 夹具中的3个标签
+SYNC_CASES = [
+    ((0, 1), (0, 2), [0, 2], True, (1, 0, 1)),          # 保留一个，删除一个，添加一个
+    ((0, 1), (0, 1), [0, 1], False, (1, 1, 0)),         # 标签不变
+    ((0, 1), (1, 0), [0, 1], False, (1, 1, 0)),         # 顺序不同，标签不变
+    ((), (0, 1, 2), [0, 1, 2], True, (1, 1, 1)),        # 从无到有
+    ((0, 1, 2), (), [], True, (0, 0, 0)),               # 全部移除
+    ((0,), (0, 0, 1), [0, 1], True, (1, 1, 0)),         # 列表中有重复
+]
+
+
+@pytest.mark.parametrize('initial, new, expected, changed, use_counts', SYNC_CASES)
+def test_sync_tags(test_prompt, tag_ids, initial, new, expected, changed, use_counts):
+    """更新标签后与预期一致，并正确报告是否有变化"""
+    for i in initial:
+        assert test_prompt.add_tag(tag_ids[i])
+    
+    assert test_prompt.sync_tags([tag_ids[i] for i in new]) is changed
+    assert sorted(_prompt_tag_ids(test_prompt.id)) == [tag_ids[i] for i in expected]
+
+
+@requires_mysql
+@pytest.mark.parametrize('initial, new, expected, changed, use_counts', SYNC_CASES)
+def test_sync_tags_use_count(test_prompt, tag_ids, initial, new, expected, changed, use_counts):
+    """添加和更新标签后 tags.use_count 与关联一致（由触发器维护）"""
+    for i in initial:
+        test_prompt.add_tag(tag_ids[i])
+    assert _use_counts(tag_ids) == {tag_id: int(i in initial) for i, tag_id in enumerate(tag_ids)}
+    
+    test_prompt.sync_tags([tag_ids[i] for i in new])
+    assert _use_counts(tag_ids) == dict(zip(tag_ids, use_counts))
+
+
+def test_sync_tags_repeated(test_prompt, tag_ids):
+    """使用相同的标签重复更新，第二次无变化"""
+    assert test_prompt.sync_tags(tag_ids[:2])
+    assert not test_prompt.sync_tags(tag_ids[:2])
+    assert _prompt_tag_ids(test_prompt.id) == set(tag_ids[:2])
+
+
+def test_sync_tags_ignores_unknown_tag(test_prompt, tag_ids):
+    """不存在的标签ID被忽略"""
+    unknown_id = db.session.scalar(db.select(db.func.max(Tag.id))) + 1
+    
+    test_prompt.sync_tags([tag_ids[0], unknown_id])
     
-    with app.app_context():
-        print("="*50)
-        print("测试标签更新功能")
-        print("="*50)
-        
-        # 1. 获取测试用户
-        test_user = User.query.filter_by(email='test@example.com').first()
-        if not test_user:
-            print("❌ 测试用户不存在")
-            return
-        print(f"✅ 测试用户: {test_user.username}")
-        
-        # 2. 创建测试Prompt
-        test_prompt = Prompt(
-            title="标签测试Prompt",
-            content="用于测试标签更新功能",
-            description="测试描述",
-            author_id=test_user.id
-        )
-        test_prompt.save()
-        prompt_id = test_prompt.id
-        print(f"✅ 创建测试Prompt，ID: {prompt_id}")
-        
-        # 3. 获取可用标签
-        tags = Tag.query.limit(3).all()
-        if len(tags) < 2:
-            print("❌ 标签数量不足，需要至少2个标签")
-            return
-        
-        tag1, tag2, tag3 = tags[0], tags[1], tags[2] if len(tags) > 2 else tags[1]
-        print(f"✅ 获取标签: {tag1.name}, {tag2.name}, {tag3.name if tag3 else 'N/A'}")
-        
-        # 4. 添加初始标签
-        print("\n步骤1: 添加初始标签")
-        test_prompt.add_tag(tag1.id)
-        test_prompt.add_tag(tag2.id)
-        
-        # 验证标签添加
-        current_tags = PromptTag.query.filter_by(prompt_id=prompt_id).all()
-        print(f"  当前标签数: {len(current_tags)}")
-        print(f"  标签ID: {[pt.tag_id for pt in current_tags]}")
-        
-        # 5. 模拟更新操作（保留一个，删除一个，添加一个）
-        print("\n步骤2: 更新标签（保留tag1，删除tag2，添加tag3）")
-        
-        # 获取当前标签ID列表
-        current_tag_ids = [pt.tag_id for pt in test_prompt.prompt_tags]
-        new_tag_ids = [tag1.id, tag3.id]  # 保留tag1，添加tag3
-        
-        # 计算需要删除和添加的标签
-        tags_to_remove = set(current_tag_ids) - set(new_tag_ids)
-        tags_to_add = set(new_tag_ids) - set(current_tag_ids)
-        
-        print(f"  需要删除的标签ID: {list(tags_to_remove)}")
-        print(f"  需要添加的标签ID: {list(tags_to_add)}")
-        
-        # 删除不需要的标签
-        for tag_id in tags_to_remove:
-            pt = PromptTag.query.filter_by(
-                prompt_id=prompt_id,
-                tag_id=tag_id
-            ).first()
-            if pt:
-                db.session.delete(pt)
-                print(f"  删除标签关联: prompt_id={prompt_id}, tag_id={tag_id}")
-        
-        # 添加新标签
-        for tag_id in tags_to_add:
-            tag = Tag.get_by_id(tag_id)
-            if tag:
-                prompt_tag = PromptTag(
-                    prompt_id=prompt_id,
-                    tag_id=tag_id
-                )
-                db.session.add(prompt_tag)
-                print(f"  添加标签关联: prompt_id={prompt_id}, tag_id={tag_id}")
-        
-        # 提交事务
-        db.session.commit()
-        print("  ✅ 标签更新成功")
-        
-        # 6. 验证更新结果
-        print("\n步骤3: 验证更新结果")
-        db.session.refresh(test_prompt)
-        final_tags = PromptTag.query.filter_by(prompt_id=prompt_id).all()
-        print(f"  最终标签数: {len(final_tags)}")
-        print(f"  标签ID: {[pt.tag_id for pt in final_tags]}")
-        
-        # 7. 测试重复更新（使用相同的标签）
-        print("\n步骤4: 测试重复更新（使用相同的标签）")
-        try:
-            # 再次使用相同的标签进行更新
-            current_tag_ids = [pt.tag_id for pt in final_tags]
-            new_tag_ids = current_tag_ids  # 使用相同的标签
-            
-            tags_to_remove = set(current_tag_ids) - set(new_tag_ids)
-            tags_to_add = set(new_tag_ids) - set(current_tag_ids)
-            
-            print(f"  需要删除的标签ID: {list(tags_to_remove)} (应该为空)")
-            print(f"  需要添加的标签ID: {list(tags_to_add)} (应该为空)")
-            
-            # 由于没有变化，不需要执行任何操作
-            if not tags_to_remove and not tags_to_add:
-                print("  ✅ 标签未变化，无需更新")
-            
-            db.session.commit()
-            print("  ✅ 重复更新测试通过")
-            
-        except Exception as e:
-            print(f"  ❌ 重复更新失败: {str(e)}")
-            db.session.rollback()
-        
-        # 8. 清理测试数据
-        print("\n步骤5: 清理测试数据")
-        # 删除测试标签关联
-        PromptTag.query.filter_by(prompt_id=prompt_id).delete()
-        # 删除测试Prompt
-        Prompt.query.filter_by(id=prompt_id).delete()
-        db.session.commit()
-        print("  ✅ 测试数据已清理")
-        
-        print("\n" + "="*50)
-        print("🎉 标签更新功能测试完成！")
-        print("="*50)
+    assert _prompt_tag_ids(test_prompt.id) == {tag_ids[0]}
+
+
+@requires_mysql
+def test_use_count_triggers(test_prompt, tag_ids):
+    """关联的增删由触发器同步到 tags.use_count，各种写关联的方式都不与触发器冲突（MySQL错误1442）"""
+    first, second, third = tag_ids
+    
+    assert test_prompt.add_tag(first)
+    assert _use_counts(tag_ids) == {first: 1, second: 0, third: 0}
+    
+    assert test_prompt.sync_tags([first, second])
+    assert _use_counts(tag_ids) == {first: 1, second: 1, third: 0}
+    
+    assert test_prompt.remove_tag(first)
+    assert _use_counts(tag_ids) == {first: 0, second: 1, third: 0}
+    
+    assert test_prompt.sync_tags([])
+    assert _use_counts(tag_ids) == {first: 0, second: 0, third: 0}
+
 
 if __name__ == "__main__":
-    test_tag_update()
\ No newline at end of file
+    raise SystemExit(pytest.main([__file__, '-v']))
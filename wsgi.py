@@ -0,0 +1,13 @@
+"""
+WSGI入口文件
+供gunicorn等WSGI服务器加载应用
+
+注意: `app` 同时是包名和 app.py 的模块名，导入时包优先，
+因此这里按文件路径加载 app.py，拿到注册了页面路由的应用实例
+"""
+
+import os
+import runpy
+
+# 加载 app.py（__name__ 不是 '__main__'，不会启动开发服务器）
+app = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'))['app']